@@ -1,66 +1,238 @@
 """
 Author: Francisco Medel Molinero
 Description of the crawler: The function of this script consist on crawl data from the web page(https://casika.es), getting the products, reference, description, current price and the discount of the products in x pages defined in the parameter of the function and store that information in a json file.
+The pages are fetched concurrently by a pool of threads that share one session (the connections are reused), with a maximum number of parallel fetches, a politeness delay between two requests to the same host and a timeout.
+The listing pages and the product pages are fetched in a pipeline: the products of a listing page are requested as soon as that page arrives.
+The data of the pages is extracted with the rules of the site and the parser backend of extractors.py.
+Every product url is fetched once, the urls of the saved products are appended to a checkpoint file (one url per line) so an interrupted crawl
+can be resumed, and the pages are kept
+in a cache on disk that is revalidated with ETag/If-Modified-Since, so an unchanged page is answered with a 304 instead of a full download.
+A page that fails (HTTP error, timeout, connection error) is reported and skipped, it is not saved in the checkpoint so a resumed crawl tries it again.
 Input of the function: the max num of pages that we want to crawl of the website.
-Output of the function: after running the script we will get a json file with the name of the products, url, description, current price and the discount of the product
+Output of the function: after running the script we will get a json lines file (one json record per product) with the name of the products, url, description, current price and the discount of the product,
+trade_spider() returns the urls that failed with their errors
 """
 
 # Imports
+import hashlib
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from extractors import get_extractor
+
+# Listing pages of the website, the number of the page is added at the end
+BASE_URL = 'https://casika.es/muebles/?page='
+
+
+# Function to write a file atomically, a crash leaves the previous version of the file
+def write_atomic(path, data):
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+# Class to keep the pages on disk with their ETag and Last-Modified headers, one body file and one json file of headers for every url
+class ResponseCache:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest())
+
+    def get(self, url):
+        path = self.path(url)
+        try:
+            with open(path + '.json') as f:
+                headers = json.load(f)
+            with open(path + '.html', 'rb') as f:
+                return headers, f.read()
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, response):
+        headers = {name: response.headers[name] for name in ('ETag', 'Last-Modified') if name in response.headers}
+        if not headers:
+            return
+        headers['Encoding'] = response.encoding
+        path = self.path(url)
+        write_atomic(path + '.html', response.content)
+        write_atomic(path + '.json', json.dumps(headers).encode('utf-8'))
+
+
+# Class to fetch urls with a shared pooled session, waiting at least delay seconds between two requests to the same host
+class Fetcher:
+    def __init__(self, concurrency=8, delay=0.0, timeout=10, cache=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.delay = delay
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        # Time at which the next request to every host can start
+        self.next_request = {}
+        self.cache = cache
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_request.get(host, now))
+            self.next_request[host] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+    def get(self, url):
+        self.wait(url)
+        cached = self.cache.get(url) if self.cache else None
+        headers = {}
+        if cached:
+            if 'ETag' in cached[0]:
+                headers['If-None-Match'] = cached[0]['ETag']
+            if 'Last-Modified' in cached[0]:
+                headers['If-Modified-Since'] = cached[0]['Last-Modified']
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if cached and response.status_code == 304:
+            # The page has not changed, it is decoded like the response it came from
+            return cached[1].decode(cached[0].get('Encoding') or 'utf-8', 'replace')
+        response.raise_for_status()
+        if self.cache and response.status_code == 200:
+            self.cache.put(url, response)
+        return response.text
+
+    def close(self):
+        self.session.close()
+
+
+# Class to keep the crawl frontier: the product urls already seen in this crawl, so every product is fetched once,
+# and the product urls already saved, which are appended to a checkpoint file (one url per line) so an interrupted crawl resumes where it stopped,
+# a line cut by a crash has no end of line and is ignored
+class CrawlFrontier:
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.saved = set()
+        if resume and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.saved = {line[:-1] for line in f if line.endswith('\n')}
+        # The checkpoint of a new crawl starts empty, the one of a resumed crawl is rewritten without the cut line
+        write_atomic(path, ''.join(url + '\n' for url in self.saved).encode('utf-8'))
+        self.seen = set(self.saved)
+        # urls that failed in this crawl with their error, they are not saved in the checkpoint
+        self.failed = {}
+        self.lock = threading.Lock()
+
+    # Function to add a url to the frontier, it returns False if the url was already seen
+    def add(self, url):
+        with self.lock:
+            if url in self.seen:
+                return False
+            self.seen.add(url)
+            return True
+
+    # Function to record a url that failed
+    def fail(self, url, error):
+        with self.lock:
+            self.failed[url] = type(error).__name__ + ': ' + str(error)
+        print('Failed ' + url + ' (' + self.failed[url] + ')')
+
+    # Function to append the urls to the checkpoint after their records have been written
+    def checkpoint(self, urls):
+        with self.lock:
+            urls = [url for url in urls if url is not None and url not in self.saved]
+            self.saved.update(urls)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(''.join(url + '\n' for url in urls))
+
+
+# Class to write one json record per line, the records are buffered and written in batches of complete lines,
+# it can be used by several threads at the same time. After every batch the urls of its records are given to on_flush
+class JsonLinesWriter:
+    def __init__(self, path, batch_size=100, append=False, on_flush=None):
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.buffer = []
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.buffer.append(line)
+            self.urls.append(record.get('url'))
+            if len(self.buffer) >= self.batch_size:
+                self.flush_buffer()
+
+    def flush_buffer(self):
+        self.file.write(''.join(self.buffer))
+        self.file.flush()
+        if self.on_flush:
+            self.on_flush(self.urls)
+        self.buffer.clear()
+        self.urls = []
+
+    def close(self):
+        with self.lock:
+            self.flush_buffer()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
 # Definition fo the main function
-def trade_spider(max_pages):
-    # We define that we want to start crawling in the first page of the website
-    page = 1
-    f = open('data.json', 'w')
-
-    # Dictionary to save the producto with its features
-    dictionary = {}
-    # list to add the features of the product
-    lista = []
-
-    while page <= max_pages:
-        url = 'https://casika.es/muebles/?page=' + str(page)
-        source_code = requests.get(url)
-        plain_text = source_code.text
-        soup = BeautifulSoup(plain_text, "html.parser")
-
-        # We use this loop to get all the products in the page
-        for link in soup.find_all('a', {'class': 'product_name'}):
-            href = link.get('href')
-
-            # Product reference(url of the specific product)
-            lista.append(href)
-
-            # We call this function to get data of the specific product
-            get_single_item_item_data(href, f, lista)
-            dictionary[link.string] = lista
-
-            # Saving the values of the dictionary in the json file
-            json.dump(dictionary, f)
-            lista.clear()
-            dictionary.clear()
-
-        page += 1
-
-
-# This function extracts specific of the url of the product
-def get_single_item_item_data(item_url, f, lista):
-    source_code = requests.get(item_url)
-    plain_text = source_code.text
-    soup = BeautifulSoup(plain_text, "html.parser")
-    for item_name in soup.find_all('div', {'class': 'product-description-short'}):
-        # Item description
-        lista.append(item_name.string)
-        # json.dump(item_name.string, f)
-
-    for div in soup.select('div.current-price'):
-        for span in div.select('span'):
-            # Item price & discount
-            lista.append(span.text)
-
-
-trade_spider(10)
+# With resume=True the products saved in the checkpoint file are skipped and the new ones are added to the output file
+# Returns the dictionary url -> error of the listing and product pages that failed
+def trade_spider(max_pages, concurrency=8, delay=0.0, timeout=10, base_url=BASE_URL, output='data.jsonl', batch_size=100,
+                 checkpoint='crawl_state.txt', cache_dir='cache', resume=False, site='casika.es', backend=None):
+    extractor = get_extractor(site, backend)
+    fetcher = Fetcher(concurrency, delay, timeout, ResponseCache(cache_dir) if cache_dir else None)
+    frontier = CrawlFrontier(checkpoint, resume)
+    with JsonLinesWriter(output, batch_size, resume, frontier.checkpoint) as writer, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        products = []
+        # future of every listing page -> its url
+        listings = {pool.submit(fetcher.get, base_url + str(page)): base_url + str(page) for page in range(1, max_pages + 1)}
+        # As soon as a listing page arrives its new product pages are requested
+        for listing in as_completed(listings):
+            try:
+                page = listing.result()
+            except requests.RequestException as e:
+                frontier.fail(listings[listing], e)
+                continue
+            for name, href in extractor.parse_listing(page):
+                if frontier.add(href):
+                    products.append(pool.submit(get_single_item_item_data, name, href, fetcher, writer, extractor, frontier))
+        for product in products:
+            product.result()
+    fetcher.close()
+    if frontier.failed:
+        print(str(len(frontier.failed)) + ' pages failed, they will be crawled again with resume=True')
+    return frontier.failed
+
+
+# This function extracts specific of the url of the product and saves the product in the json lines file,
+# a product page that can't be fetched is recorded in the frontier and the crawl goes on
+def get_single_item_item_data(name, item_url, fetcher, writer, extractor, frontier):
+    try:
+        page = fetcher.get(item_url)
+    except requests.RequestException as e:
+        frontier.fail(item_url, e)
+        return
+    record = {'name': name, 'url': item_url}
+    record.update(extractor.parse_product(page))
+    writer.write(record)
+
+
+if __name__ == '__main__':
+    trade_spider(10)
@@ -0,0 +1,134 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Extraction of the products of the listing pages and of the features of the product pages, with the rules of every site
+(tag and class of the product links, the description and the price) and a pluggable parser backend:
+"html.parser" and "lxml" parse with BeautifulSoup only the nodes of the rules (SoupStrainer), "lxml-xpath" finds the nodes with XPath on an lxml tree.
+The benchmark gives the pages per second of every backend over the pages of the response cache of the crawler.
+Input of the function: html of a listing page or a product page
+Output of the function: list of (name, url) of the products of a listing page, dictionary with the description, price and discount of a product page
+"""
+
+# Imports
+import os
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+# Extraction rules of every site: tag and class of the nodes of the product links, the description and the price (and discount) spans
+RULES = {
+    'casika.es': {
+        'product_name': ('a', 'product_name'),
+        'description': ('div', 'product-description-short'),
+        'price': ('div', 'current-price'),
+    },
+}
+
+
+# Function to get the string of a node like BeautifulSoup .string: the text of a node with only one child, None otherwise
+def node_string(node):
+    while len(node) == 1 and not node.text and not node[0].tail:
+        node = node[0]
+    return node.text if len(node) == 0 else None
+
+
+# Function to match the class attribute of a node while it is parsed, the attribute is still the whole string of classes
+def has_class(*classes):
+    def match(value):
+        return value is not None and any(cls in classes for cls in value.split())
+    return match
+
+
+# Class to extract the data of the pages of a site with BeautifulSoup, with strain=True only the nodes of the rules are parsed
+class SoupExtractor:
+    def __init__(self, rules, parser='html.parser', strain=True):
+        self.rules = rules
+        self.parser = parser
+        self.listing = self.product = None
+        if strain:
+            self.listing = SoupStrainer(rules['product_name'][0], attrs={'class': has_class(rules['product_name'][1])})
+            self.product = SoupStrainer([rules['description'][0], rules['price'][0]],
+                                        attrs={'class': has_class(rules['description'][1], rules['price'][1])})
+
+    def parse_listing(self, plain_text):
+        soup = BeautifulSoup(plain_text, self.parser, parse_only=self.listing)
+        tag, cls = self.rules['product_name']
+        return [(link.string, link.get('href')) for link in soup.find_all(tag, {'class': cls})]
+
+    def parse_product(self, plain_text):
+        soup = BeautifulSoup(plain_text, self.parser, parse_only=self.product)
+        # Item description
+        description = soup.find(self.rules['description'][0], {'class': self.rules['description'][1]})
+        # Item price & discount
+        tag, cls = self.rules['price']
+        prices = [span.text for div in soup.find_all(tag, {'class': cls}) for span in div.find_all('span')]
+        return {'description': description.string if description else None,
+                'price': prices[0] if prices else None,
+                'discount': prices[1] if len(prices) > 1 else None}
+
+
+# Class to extract the data of the pages of a site with XPath over the lxml tree
+class XPathExtractor:
+    def __init__(self, rules):
+        def xpath(tag, cls):
+            return "//%s[contains(concat(' ', normalize-space(@class), ' '), ' %s ')]" % (tag, cls)
+        self.product_name = xpath(*rules['product_name'])
+        self.description = xpath(*rules['description'])
+        self.price = xpath(*rules['price']) + '//span'
+        self.parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    # The page is given to lxml in bytes, a str with an encoding declaration is not accepted
+    def tree(self, plain_text):
+        return lxml.html.fromstring(plain_text.encode('utf-8'), parser=self.parser)
+
+    def parse_listing(self, plain_text):
+        tree = self.tree(plain_text)
+        return [(node_string(link), link.get('href')) for link in tree.xpath(self.product_name)]
+
+    def parse_product(self, plain_text):
+        tree = self.tree(plain_text)
+        # Item description
+        description = tree.xpath(self.description)
+        # Item price & discount
+        prices = [span.text_content() for span in tree.xpath(self.price)]
+        return {'description': node_string(description[0]) if description else None,
+                'price': prices[0] if prices else None,
+                'discount': prices[1] if len(prices) > 1 else None}
+
+
+# Function to get the extractor of a site with the backend given, by default the fastest one that is installed,
+# the backends ending in "-full" parse the whole page as the first version of the crawler did
+def get_extractor(site='casika.es', backend=None):
+    if backend is None:
+        backend = 'lxml-xpath' if lxml else 'html.parser'
+    if backend == 'lxml-xpath':
+        return XPathExtractor(RULES[site])
+    if backend in ('html.parser', 'lxml'):
+        return SoupExtractor(RULES[site], backend)
+    if backend in ('html.parser-full', 'lxml-full'):
+        return SoupExtractor(RULES[site], backend[:-len('-full')], strain=False)
+    raise ValueError("unknown backend: " + str(backend))
+
+
+# Function to measure the pages per second of every backend parsing the product pages saved in the response cache
+def benchmark(cache_dir='cache', backends=('html.parser-full', 'html.parser', 'lxml', 'lxml-xpath'), site='casika.es'):
+    pages = []
+    for file in sorted(os.listdir(cache_dir)):
+        if file.endswith('.html'):
+            with open(os.path.join(cache_dir, file), 'rb') as f:
+                pages.append(f.read().decode('utf-8', 'replace'))
+    results = {}
+    for backend in backends:
+        if backend.startswith('lxml') and lxml is None:
+            continue
+        extractor = get_extractor(site, backend)
+        start = time.perf_counter()
+        for page in pages:
+            extractor.parse_product(page)
+        results[backend] = len(pages) / (time.perf_counter() - start)
+        print(backend + ": " + str(round(results[backend], 1)) + " pages per second")
+    return results
@@ -0,0 +1,136 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Evaluation of the binary, Term Frequency and TF-IDF weighting schemas with Cosine and Euclidean measures using ranked retrieval metrics.
+The relevance judgements are loaded once as sets, the queries are split in chunks that are evaluated in a pool of processes (every process fits the
+weighting schemas once) and the rows are written to the csv file as soon as every chunk finishes.
+For every cutoff it computes Precision, Recall, Average Precision, nDCG and Reciprocal Rank, and at the end it prints the means (MAP, MRR, ...) and the time spent by every weighting schema.
+Input of the function: cranfield folder with data in csv format
+Output of the function: output.csv
+"""
+
+
+# imports
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from main import read_corpus, get_batch_matrices, batch_cos_and_euclidean, batch_tf_idf_cos
+import numpy as np
+import argparse
+import time
+import csv
+
+METRICS = ["P", "R", "AP", "nDCG", "RR"]
+SCHEMAS = ["binary", "tf", "tf_idf"]
+
+# matrices of the worker, fitted once by init_worker
+worker_matrices = None
+
+
+# Function to load the relevant documents of all the queries, one set per query
+def load_qrels(size):
+    qrels = []
+    for q in range(size):
+        with open("./cranfield/r/" + str(q + 1) + ".txt") as file:
+            qrels.append({int(line) for line in file if line.strip()})
+    return qrels
+
+
+# Function to get the metrics of a ranking (documents starting at 1) for every cutoff,
+# the ideal ranking has the relevant documents in the first positions up to the largest cutoff, also when the ranking is shorter
+def ranking_metrics(ranking, relevant, cutoffs):
+    hits = np.array([document in relevant for document in ranking], dtype=np.float64)
+    found = np.cumsum(hits)
+    positions = np.arange(1, len(hits) + 1)
+    gains = hits / np.log2(positions + 1)
+    ideal = np.cumsum(1 / np.log2(np.arange(1, max(cutoffs) + 1) + 1))
+
+    metrics = []
+    for k in cutoffs:
+        found_k = found[min(k, len(found)) - 1] if len(found) else 0.0
+        first = np.flatnonzero(hits[:k])
+        metrics += [found_k / k,
+                    found_k / len(relevant) if relevant else 0.0,
+                    np.sum(hits[:k] * found[:k] / positions[:k]) / len(relevant) if relevant else 0.0,
+                    np.sum(gains[:k]) / ideal[min(len(relevant), k) - 1] if relevant else 0.0,
+                    1 / (first[0] + 1) if len(first) else 0.0]
+    return metrics
+
+
+# Function that fits the weighting schemas once in every process of the pool
+def init_worker(corpus, queries):
+    global worker_matrices
+    worker_matrices = get_batch_matrices(corpus, queries)
+
+
+# Function to rank a chunk of queries with every weighting schema and measure, returns the rankings and the seconds spent per schema
+def rank_chunk(first, last, depth):
+    rankings = {}
+    times = {}
+    for schema in SCHEMAS:
+        start = time.perf_counter()
+        docs, queries = worker_matrices[schema]
+        if schema == "tf_idf":
+            # the TF-IDF vectors are normalized, so the euclidean distance (2 - 2 cosine) gives the same ranking as the cosine
+            cosine = batch_tf_idf_cos(docs, queries[first:last], depth)
+            euclidean = cosine
+        else:
+            cosine, euclidean = batch_cos_and_euclidean(docs, queries[first:last], depth)
+        rankings[(schema, "cosine")] = cosine
+        rankings[(schema, "euclidean")] = euclidean
+        times[schema] = time.perf_counter() - start
+    return first, rankings, times
+
+
+# Function to evaluate all the queries in a pool of processes and write the rows to the csv file while the chunks finish
+def evaluate(corpus, queries, qrels, cutoffs=(5, 10, 20), output_file="output.csv", workers=None, chunk_size=25):
+    depth = max(cutoffs)
+    totals = {}
+    times = dict.fromkeys(SCHEMAS, 0.0)
+    start = time.perf_counter()
+
+    with open(output_file, 'w') as file:
+        output = csv.writer(file, delimiter=";")
+        output.writerow(["query", "weighting", "measure"] + [metric + "@" + str(k) for k in cutoffs for metric in METRICS])
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(corpus, queries)) as pool:
+            tasks = [pool.submit(rank_chunk, first, min(first + chunk_size, len(queries)), depth)
+                     for first in range(0, len(queries), chunk_size)]
+            for task in as_completed(tasks):
+                first, rankings, chunk_times = task.result()
+                for schema in chunk_times:
+                    times[schema] += chunk_times[schema]
+                for (schema, measure), ranking in rankings.items():
+                    for q, retrieved in enumerate(ranking, first):
+                        metrics = ranking_metrics(retrieved, qrels[q], cutoffs)
+                        totals[(schema, measure)] = totals.get((schema, measure), 0) + np.array(metrics)
+                        output.writerow([q + 1, schema, measure] + metrics)
+                file.flush()
+
+    means = {key: total / len(queries) for key, total in totals.items()}
+    return means, times, time.perf_counter() - start
+
+
+# Main function to evaluate the cranfield collection and print the mean metrics and times
+def main():
+    parser = argparse.ArgumentParser(description="Ranked retrieval evaluation of the cranfield collection")
+    parser.add_argument("--documents", type=int, default=1400)
+    parser.add_argument("--queries", type=int, default=225)
+    parser.add_argument("--cutoffs", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="output.csv")
+    args = parser.parse_args()
+
+    corpus = read_corpus("d", args.documents)
+    queries = read_corpus("q", args.queries)
+    qrels = load_qrels(args.queries)
+    means, times, wall_time = evaluate(corpus, queries, qrels, args.cutoffs, args.output, args.workers)
+
+    names = [metric + "@" + str(k) for k in args.cutoffs for metric in METRICS]
+    print("weighting;measure;" + ";".join("mean " + name for name in names))
+    for (schema, measure), mean in sorted(means.items()):
+        print(schema + ";" + measure + ";" + ";".join(str(round(value, 4)) for value in mean))
+    for schema in SCHEMAS:
+        print("time " + schema + ": " + str(round(times[schema], 3)) + " s")
+    print("wall time: " + str(round(wall_time, 3)) + " s")
+
+
+if __name__ == '__main__':
+    main()
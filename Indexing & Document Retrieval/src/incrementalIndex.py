@@ -0,0 +1,183 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Incremental TF-IDF index for a document set that changes continuously. New documents go to a small in-memory buffer that
+becomes a segment (sparse term frequency matrix) when it is full or when a query arrives, deleted documents are marked and removed when the segments
+are merged, and an update is a delete plus an add. The document frequencies are updated with every change, the idf and the document norms are only
+recomputed when a query needs them, so the queries see the new documents immediately and rank like a TfidfVectorizer fitted on the live documents.
+Input of the function: documents to add, delete or update and the text of the queries
+Output of the function: the best documents for every query with their TF-IDF cosine scores
+"""
+
+
+# imports
+from sklearn.feature_extraction.text import CountVectorizer
+from main import read_corpus
+from collections import Counter
+import scipy.sparse as sp
+import numpy as np
+import argparse
+
+
+# Function to create an empty incremental index
+def new_index(segment_size=100, max_segments=10):
+    return {"analyzer": CountVectorizer().build_analyzer(),
+            "vocabulary": {},
+            "df": np.zeros(0, dtype=np.int64),
+            "segments": [],
+            "buffer": [],
+            # document id -> [segment (None while it is in the buffer), row]
+            "locations": {},
+            "segment_size": segment_size,
+            "max_segments": max_segments,
+            # the idf is recomputed when the version of the document frequencies changes
+            "version": 0,
+            "idf": None,
+            "idf_version": -1}
+
+
+# Function to add a document to the index, it can be searched from the next query
+def add_document(index, document, text):
+    if document in index["locations"]:
+        raise ValueError("document " + str(document) + " is already in the index, use update_document")
+    counts = Counter(index["analyzer"](text))
+    terms = []
+    for word in counts:
+        if word not in index["vocabulary"]:
+            index["vocabulary"][word] = len(index["vocabulary"])
+        terms.append(index["vocabulary"][word])
+    if len(index["vocabulary"]) > len(index["df"]):
+        index["df"] = np.concatenate((index["df"], np.zeros(len(index["vocabulary"]) - len(index["df"]), dtype=np.int64)))
+    index["df"][terms] += 1
+    index["version"] += 1
+
+    index["locations"][document] = [None, len(index["buffer"])]
+    index["buffer"].append((document, terms, list(counts.values())))
+    if len(index["buffer"]) >= index["segment_size"]:
+        flush(index)
+
+
+# Function to delete a document, its row is only removed from the segments when they are merged
+def delete_document(index, document):
+    if index["locations"][document][0] is None:
+        flush(index)
+    segment, row = index["locations"].pop(document)
+    matrix = index["segments"][segment]["matrix"]
+    index["df"][matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]] -= 1
+    index["version"] += 1
+    index["segments"][segment]["live"][row] = False
+
+
+# Function to replace the text of a document
+def update_document(index, document, text):
+    delete_document(index, document)
+    add_document(index, document, text)
+
+
+# Function to turn the buffer into a new segment and merge the segments when there are too many
+def flush(index):
+    if not index["buffer"]:
+        return
+    documents, rows, columns, data = [], [], [], []
+    for row, (document, terms, counts) in enumerate(index["buffer"]):
+        documents.append(document)
+        rows += [row] * len(terms)
+        columns += terms
+        data += counts
+        index["locations"][document] = [len(index["segments"]), row]
+    matrix = sp.csr_matrix((data, (rows, columns)), shape=(len(documents), len(index["vocabulary"])), dtype=np.float64)
+    index["segments"].append({"matrix": matrix,
+                              "documents": np.array(documents),
+                              "live": np.ones(len(documents), dtype=bool),
+                              "norms": None,
+                              "norms_version": -1})
+    index["buffer"] = []
+    if len(index["segments"]) > index["max_segments"]:
+        merge_segments(index)
+
+
+# Function to merge all the segments in one, the deleted documents are removed
+def merge_segments(index):
+    flush(index)
+    if not index["segments"]:
+        return
+    columns = len(index["vocabulary"])
+    matrices, documents = [], []
+    for segment in index["segments"]:
+        matrix = segment["matrix"][segment["live"]]
+        matrices.append(sp.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], columns)))
+        documents.append(segment["documents"][segment["live"]])
+    documents = np.concatenate(documents)
+    index["segments"] = [{"matrix": sp.vstack(matrices, format="csr"),
+                          "documents": documents,
+                          "live": np.ones(len(documents), dtype=bool),
+                          "norms": None,
+                          "norms_version": -1}]
+    index["locations"] = {document: [0, row] for row, document in enumerate(documents.tolist())}
+
+
+# Function to get the idf of every term (smooth idf like the TfidfVectorizer), it is only recomputed after a change
+def get_idf(index):
+    if index["idf_version"] != index["version"]:
+        n = len(index["locations"])
+        index["idf"] = np.log((1 + n) / (1 + index["df"])) + 1
+        index["idf_version"] = index["version"]
+    return index["idf"]
+
+
+# Function to get the TF-IDF norms of the documents of a segment, they are only recomputed after a change
+def get_norms(index, segment):
+    if segment["norms_version"] != index["version"]:
+        matrix = segment["matrix"]
+        squared_idf = get_idf(index)[:matrix.shape[1]] ** 2
+        segment["norms"] = np.sqrt(matrix.multiply(matrix) @ squared_idf)
+        segment["norms_version"] = index["version"]
+    return segment["norms"]
+
+
+# Function to score a query with TF-IDF cosine over all the segments, returns the k best document ids and their scores
+def search(index, query, k=20):
+    flush(index)
+    idf = get_idf(index)
+    weights = np.zeros(len(idf))
+    for word, count in Counter(index["analyzer"](query)).items():
+        term = index["vocabulary"].get(word)
+        # the terms of deleted documents only are not in the vocabulary of a full rebuild
+        if term is not None and index["df"][term] > 0:
+            weights[term] = count * idf[term]
+    query_norm = np.linalg.norm(weights)
+
+    documents, scores = [], []
+    for segment in index["segments"]:
+        matrix = segment["matrix"]
+        dot = matrix @ (weights[:matrix.shape[1]] * idf[:matrix.shape[1]])
+        live = segment["live"] & (dot > 0)
+        documents.append(segment["documents"][live])
+        scores.append(dot[live] / (get_norms(index, segment)[live] * query_norm))
+    if not documents:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    documents, scores = np.concatenate(documents), np.concatenate(scores)
+
+    # ties are broken by the lowest document id
+    best = np.lexsort((documents, -scores))[:k]
+    return documents[best], scores[best]
+
+
+# Main function: index the cranfield documents one by one and print the best documents of a text
+def main():
+    parser = argparse.ArgumentParser(description="Incremental TF-IDF index of the cranfield documents")
+    parser.add_argument("text")
+    parser.add_argument("--documents", type=int, default=1400)
+    parser.add_argument("--segment-size", type=int, default=100)
+    parser.add_argument("-k", type=int, default=20)
+    args = parser.parse_args()
+
+    index = new_index(args.segment_size)
+    for d, text in enumerate(read_corpus("d", args.documents)):
+        add_document(index, d + 1, text)
+    merge_segments(index)
+    for document, score in zip(*search(index, args.text, args.k)):
+        print(str(document) + ";" + str(score))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Persistent inverted index for the document retrieval module. The build step writes to disk a sorted term dictionary
+(the UTF-8 bytes of the terms one after the other and the offset where every term starts),
+the postings of every term (document gaps and term frequencies compressed as varints) in blocks of BLOCK_SIZE postings with a skip entry per block
+(byte offset, last document and best normalized weight, so a block can be decoded alone or skipped), the idf of every term and the norm of every document.
+The query step memory-maps those files and scores the documents with TF-IDF cosine using term-at-a-time accumulation over the postings of the query terms only.
+Input of the function: cranfield folder with the documents (build) and the text of a query (query)
+Output of the function: index folder (build) and the best documents for the query with their scores (query)
+"""
+
+
+# imports
+from sklearn.feature_extraction.text import CountVectorizer
+from main import read_corpus
+import numpy as np
+import argparse
+import bisect
+import os
+
+# postings per block of a posting list, the unit that the top-k search decodes or skips
+BLOCK_SIZE = 128
+
+# Function to get the number of bytes that every integer needs as a varint (7 bits per byte)
+def varint_sizes(values):
+    sizes = np.ones(len(values), dtype=np.int64)
+    values = np.asarray(values, dtype=np.uint64) >> np.uint64(7)
+    while values.any():
+        sizes += values > 0
+        values = values >> np.uint64(7)
+    return sizes
+
+
+# Function to encode an array of non negative integers as varints, the high bit of a byte says that more bytes follow
+def encode_varints(values):
+    values = np.asarray(values, dtype=np.uint64)
+    sizes = varint_sizes(values)
+    starts = np.cumsum(sizes) - sizes
+    encoded = np.empty(sizes.sum(), dtype=np.uint8)
+    for byte in range(sizes.max(initial=0)):
+        mask = sizes > byte
+        chunk = (values[mask] >> np.uint64(7 * byte)) & np.uint64(127)
+        more = np.where(sizes[mask] - 1 > byte, 128, 0).astype(np.uint64)
+        encoded[starts[mask] + byte] = chunk | more
+    return encoded
+
+
+# Function to decode a buffer of varints into an array of integers
+def decode_varints(buffer):
+    buffer = np.asarray(buffer, dtype=np.uint8)
+    if len(buffer) == 0:
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(buffer < 128)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # position of every byte inside its varint
+    position = np.arange(len(buffer)) - np.repeat(starts, ends - starts + 1)
+    chunks = (buffer & 127).astype(np.int64) << (7 * position)
+    return np.bitwise_or.reduceat(chunks, starts)
+
+
+# Function to build the inverted index of a corpus and save it in a folder
+def build_index(corpus, folder="index"):
+    vectorizer = CountVectorizer()
+    # one column per term, so the postings of every term are consecutive and sorted by document
+    tf_matrix = vectorizer.fit_transform(corpus).tocsc()
+    tf_matrix.sort_indices()
+    terms = vectorizer.get_feature_names_out()
+
+    # TF-IDF weights like the TfidfVectorizer (smooth idf)
+    n = tf_matrix.shape[0]
+    df = np.diff(tf_matrix.indptr)
+    idf = np.log((1 + n) / (1 + df)) + 1
+    weights = tf_matrix.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+    # upper bound of the normalized weight of every term, used to skip documents in the top-k search (an empty document has norm 0 and no terms)
+    inverse_norms = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+    max_scores = np.asarray(weights.multiply(inverse_norms[:, None]).tocsc().max(axis=0).todense()).ravel()
+
+    # postings: gap with the previous document of the term and term frequency, one pair after the other
+    gaps = np.diff(tf_matrix.indices, prepend=0)
+    gaps[tf_matrix.indptr[:-1]] = tf_matrix.indices[tf_matrix.indptr[:-1]]
+    pairs = np.empty(2 * len(gaps), dtype=np.int64)
+    pairs[0::2] = gaps
+    pairs[1::2] = tf_matrix.data
+
+    # byte offset where the postings of every term start
+    sizes = varint_sizes(pairs)
+    pair_offsets = np.concatenate(([0], np.cumsum(sizes[0::2] + sizes[1::2])))
+    offsets = pair_offsets[tf_matrix.indptr]
+
+    # skip entries: every posting list is cut in blocks of BLOCK_SIZE postings, the blocks of term t are term_blocks[t]:term_blocks[t + 1]
+    blocks = -(-df // BLOCK_SIZE)
+    term_blocks = np.concatenate(([0], np.cumsum(blocks)))
+    block_starts = np.repeat(tf_matrix.indptr[:-1], blocks) + (np.arange(term_blocks[-1]) - np.repeat(term_blocks[:-1], blocks)) * BLOCK_SIZE
+    block_ends = np.minimum(block_starts + BLOCK_SIZE, np.repeat(tf_matrix.indptr[1:], blocks))
+    # upper bound of the normalized weight of the term in the documents of every block
+    normalized = tf_matrix.data * np.repeat(idf, df) * inverse_norms[tf_matrix.indices]
+    block_max = np.maximum.reduceat(normalized, block_starts) if len(block_starts) else np.empty(0)
+
+    os.makedirs(folder, exist_ok=True)
+    save_terms(terms, folder)
+    np.save(os.path.join(folder, "offsets.npy"), offsets.astype(np.int64))
+    np.save(os.path.join(folder, "df.npy"), df.astype(np.int64))
+    np.save(os.path.join(folder, "term_blocks.npy"), term_blocks.astype(np.int64))
+    np.save(os.path.join(folder, "block_offsets.npy"), np.append(pair_offsets[block_starts], pair_offsets[-1]).astype(np.int64))
+    np.save(os.path.join(folder, "block_last.npy"), tf_matrix.indices[block_ends - 1].astype(np.int64))
+    np.save(os.path.join(folder, "block_max.npy"), block_max)
+    np.save(os.path.join(folder, "idf.npy"), idf)
+    np.save(os.path.join(folder, "norms.npy"), norms)
+    np.save(os.path.join(folder, "max_scores.npy"), max_scores)
+    encode_varints(pairs).tofile(os.path.join(folder, "postings.bin"))
+
+
+# Function to save the sorted terms as their UTF-8 bytes one after the other (terms.bin) and the byte offset where every term starts (term_offsets.npy)
+def save_terms(terms, folder):
+    encoded = [term.encode("utf-8") for term in terms]
+    lengths = np.fromiter((len(term) for term in encoded), dtype=np.int64, count=len(encoded))
+    np.save(os.path.join(folder, "term_offsets.npy"), np.concatenate(([0], np.cumsum(lengths))))
+    with open(os.path.join(folder, "terms.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+
+
+# Sorted term dictionary on the memory-mapped bytes of the terms, a term is read only when the binary search compares it
+# (the UTF-8 bytes are sorted in the same order as the strings, so the search compares bytes).
+# The maps are read through memoryviews, a binary search makes many small reads and they are much faster than numpy indexing
+class TermDictionary:
+    def __init__(self, folder):
+        self.offsets = memoryview(np.asarray(np.load(os.path.join(folder, "term_offsets.npy"), mmap_mode="r")))
+        self.data = memoryview(np.asarray(np.memmap(os.path.join(folder, "terms.bin"), dtype=np.uint8, mode="r"))) \
+            if os.path.getsize(os.path.join(folder, "terms.bin")) else memoryview(b"")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, term):
+        return self.data[self.offsets[term]:self.offsets[term + 1]].tobytes()
+
+    # Function to get the id of a term, -1 if it is not in the dictionary
+    def find(self, word):
+        word = word.encode("utf-8")
+        position = bisect.bisect_left(self, word)
+        return position if position < len(self) and self[position] == word else -1
+
+
+# Function to open an index folder, every file is memory-mapped so nothing is read until a query needs it
+# (the arrays are plain numpy views of the maps, the indexing of np.memmap objects is much slower for the small reads of a query)
+def load_index(folder="index"):
+    index = {"terms": TermDictionary(folder)}
+    for name in ("offsets", "df", "term_blocks", "block_offsets", "block_last", "block_max", "idf", "norms", "max_scores"):
+        index[name] = np.asarray(np.load(os.path.join(folder, name + ".npy"), mmap_mode="r"))
+    index["postings"] = np.asarray(np.memmap(os.path.join(folder, "postings.bin"), dtype=np.uint8, mode="r"))
+    index["analyzer"] = CountVectorizer().build_analyzer()
+    return index
+
+
+# Function to get the documents (starting at 0) and term frequencies of a term id
+def get_postings(index, term):
+    pairs = decode_varints(index["postings"][index["offsets"][term]:index["offsets"][term + 1]])
+    return np.cumsum(pairs[0::2]), pairs[1::2]
+
+
+# Function to get the documents and term frequencies of some blocks (sorted) of a term, only the bytes of those blocks are decoded.
+# The gaps go on from the last document of the previous block, that is in the skip entries
+def get_block_postings(index, term, blocks):
+    blocks = np.asarray(blocks, dtype=np.int64)
+    if len(blocks) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # the bytes of every run of consecutive blocks are read with one slice
+    runs = np.flatnonzero(np.diff(blocks) != 1) + 1
+    run_starts = blocks[np.append(0, runs)].tolist()
+    run_ends = (blocks[np.append(runs - 1, len(blocks) - 1)] + 1).tolist()
+    offsets = index["block_offsets"]
+    buffer = np.concatenate([index["postings"][offsets[start]:offsets[end]] for start, end in zip(run_starts, run_ends)])
+    pairs = decode_varints(buffer)
+    # every block has BLOCK_SIZE postings but the last one of the term
+    first = index["term_blocks"][term]
+    lengths = np.minimum(BLOCK_SIZE, index["df"][term] - (blocks - first) * BLOCK_SIZE)
+    bases = np.where(blocks > first, index["block_last"][np.maximum(blocks - 1, first)], 0)
+    documents = np.cumsum(pairs[0::2])
+    block_firsts = np.cumsum(lengths) - lengths
+    # every block starts again from its base instead of the sum of the gaps of the blocks before it
+    documents += np.repeat(bases - (documents[block_firsts] - pairs[0::2][block_firsts]), lengths)
+    return documents, pairs[1::2]
+
+
+# Function to get the term ids and frequencies of the words of a query that are in the dictionary
+def query_terms(index, query):
+    words, counts = np.unique(index["analyzer"](query), return_counts=True)
+    position = np.array([index["terms"].find(word) for word in words.tolist()], dtype=np.int64)
+    found = position >= 0
+    return position[found], counts[found]
+
+
+# Function to score a query with TF-IDF cosine accumulating only the postings of its terms, returns the k best documents (starting at 1) and their scores
+def search(index, query, k=20):
+    accumulators = np.zeros(len(index["norms"]))
+    query_norm = 0
+    for term, count in zip(*query_terms(index, query)):
+        weight = count * index["idf"][term]
+        query_norm += weight ** 2
+        # the documents of a posting list are unique, so we can add the whole list at once
+        documents, frequencies = get_postings(index, term)
+        accumulators[documents] += weight * index["idf"][term] * frequencies
+
+    documents = np.flatnonzero(accumulators)
+    scores = accumulators[documents] / (np.asarray(index["norms"][documents]) * np.sqrt(query_norm))
+    best = best_documents(documents, scores, k)
+    return documents[best] + 1, scores[best]
+
+
+# Function to get the positions of the k best scores, ties are broken by the lowest document
+def best_documents(documents, scores, k=20):
+    if len(scores) <= k:
+        return np.lexsort((documents, -scores))
+    # np.partition finds the k-th score, only the documents with that score or better are sorted
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    candidates = np.flatnonzero(scores >= kth)
+    return candidates[np.lexsort((documents[candidates], -scores[candidates]))[:k]]
+
+
+# Main function: "build" creates the index of the cranfield documents and "query" prints the best documents for a text
+def main():
+    parser = argparse.ArgumentParser(description="Inverted index of the cranfield documents")
+    parser.add_argument("step", choices=["build", "query"])
+    parser.add_argument("text", nargs="?", default="")
+    parser.add_argument("--index", default="index")
+    parser.add_argument("--documents", type=int, default=1400)
+    parser.add_argument("-k", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.step == "build":
+        build_index(read_corpus("d", args.documents), args.index)
+    else:
+        index = load_index(args.index)
+        for document, score in zip(*search(index, args.text, args.k)):
+            print(str(document) + ";" + str(score))
+
+
+if __name__ == '__main__':
+    main()
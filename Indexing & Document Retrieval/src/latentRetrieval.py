@@ -0,0 +1,113 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Latent semantic retrieval mode to compare with the exact sparse TF-IDF cosine ranking. The TF-IDF matrix of the documents is
+projected to a few hundred dimensions with truncated SVD, the normalized document vectors are stored as a contiguous float32 array and the queries are
+answered with an IVF index (k-means cells with an inverted list of documents per cell, only the nprobe closest cells are scanned).
+For every nprobe it reports the recall@k against the exact ranking, the mean latency of a query and the memory of the index.
+Input of the function: cranfield folder with data in csv format
+Output of the function: recall, latency and memory of the latent mode for every number of cells scanned
+"""
+
+
+# imports
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from sklearn.cluster import KMeans
+from main import read_corpus
+import numpy as np
+import argparse
+import time
+
+
+# Function to fit the TF-IDF matrix of the documents and project it with truncated SVD, returns the models and the normalized float32 document vectors
+def build_lsa(corpus, dimensions=200):
+    vectorizer = TfidfVectorizer()
+    tf_idf_matrix = vectorizer.fit_transform(corpus)
+    dimensions = min(dimensions, min(tf_idf_matrix.shape) - 1)
+    svd = TruncatedSVD(n_components=dimensions, random_state=0)
+    vectors = normalize_rows(svd.fit_transform(tf_idf_matrix))
+    return vectorizer, svd, tf_idf_matrix, vectors
+
+
+# Function to normalize the rows of a matrix as a contiguous float32 array, so the inner product is the cosine
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.ascontiguousarray(matrix / np.where(norms > 0, norms, 1), dtype=np.float32)
+
+
+# Function to build the IVF index: the documents are grouped by k-means cell and stored one cell after the other
+def build_ivf(vectors, cells=None):
+    if cells is None:
+        cells = max(1, int(np.sqrt(len(vectors))))
+    kmeans = KMeans(n_clusters=cells, n_init=1, random_state=0).fit(vectors)
+    order = np.argsort(kmeans.labels_, kind="stable")
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(kmeans.labels_, minlength=cells))))
+    return {"centroids": np.ascontiguousarray(kmeans.cluster_centers_, dtype=np.float32),
+            "vectors": vectors[order],
+            "documents": order.astype(np.int32),
+            "offsets": offsets}
+
+
+# Function to get the memory in bytes of the arrays of an index
+def index_memory(ivf):
+    return sum(array.nbytes for array in ivf.values())
+
+
+# Function to search the k best documents (starting at 1) of a query vector scanning the nprobe closest cells
+def search_ivf(ivf, query_vector, k=20, nprobe=4):
+    nprobe = min(nprobe, len(ivf["centroids"]))
+    cells = np.argpartition(-(ivf["centroids"] @ query_vector), nprobe - 1)[:nprobe]
+    positions = np.concatenate([np.arange(ivf["offsets"][c], ivf["offsets"][c + 1]) for c in cells])
+    scores = ivf["vectors"][positions] @ query_vector
+    k = min(k, len(scores))
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best], kind="stable")]
+    return ivf["documents"][positions[best]] + 1
+
+
+# Function to get the exact k best documents (starting at 1) of every query with the sparse TF-IDF cosine
+def exact_rankings(tf_idf_matrix, query_matrix, k=20):
+    scores = (query_matrix @ tf_idf_matrix.T).toarray()
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return best + 1
+
+
+# Function to evaluate the latent mode against the exact ranking for several numbers of cells scanned
+def evaluate(corpus, queries, dimensions=200, cells=None, probes=(1, 2, 4, 8), k=20):
+    vectorizer, svd, tf_idf_matrix, vectors = build_lsa(corpus, dimensions)
+    query_matrix = vectorizer.transform(queries)
+    query_vectors = normalize_rows(svd.transform(query_matrix))
+    exact = exact_rankings(tf_idf_matrix, query_matrix, k)
+    ivf = build_ivf(vectors, cells)
+
+    results = []
+    for nprobe in probes:
+        found = 0
+        start = time.perf_counter()
+        for q, query_vector in enumerate(query_vectors):
+            found += len(np.intersect1d(search_ivf(ivf, query_vector, k, nprobe), exact[q]))
+        latency = (time.perf_counter() - start) / len(queries)
+        results.append([nprobe, found / (k * len(queries)), latency * 1000, index_memory(ivf) / 2 ** 20])
+    return results
+
+
+# Main function to print the recall@k, latency and memory of the latent mode
+def main():
+    parser = argparse.ArgumentParser(description="Latent semantic retrieval with an IVF index")
+    parser.add_argument("--documents", type=int, default=1400)
+    parser.add_argument("--queries", type=int, default=225)
+    parser.add_argument("--dimensions", type=int, default=200)
+    parser.add_argument("--cells", type=int, default=None)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("-k", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = read_corpus("d", args.documents)
+    queries = read_corpus("q", args.queries)
+    print("nprobe;recall@" + str(args.k) + ";latency (ms);index memory (MB)")
+    for row in evaluate(corpus, queries, args.dimensions, args.cells, args.probes, args.k):
+        print(";".join(str(round(value, 4)) for value in row))
+
+
+if __name__ == '__main__':
+    main()
@@ -31,13 +31,13 @@ def get_matrices(data):
     return bin_matrix, tf_matrix, tf_idf_matrix
 
 
-# Function to calculate cosine and euclidean's values
-def cos_and_euclidean(matrix):
+# Function to calculate cosine and euclidean's values, the query is the row after the documents
+def cos_and_euclidean(matrix, documents=1400):
     # COSINE
-    sim_cos = np.array(cosine_similarity(matrix[1400], matrix[0:(1400)])[0])
+    sim_cos = np.array(cosine_similarity(matrix[documents], matrix[0:documents])[0])
     sorted_cos = sim_cos.argsort()[::-1] + 1
     # EUCLIDEAN
-    sim_eu = np.array(euclidean_distances(matrix[1400], matrix[0:(1400)])[0])
+    sim_eu = np.array(euclidean_distances(matrix[documents], matrix[0:documents])[0])
     sorted_eu = sim_eu.argsort() + 1
 
     return [sorted_cos[:20], sorted_eu[:20]]
@@ -104,8 +104,98 @@ def processing(data, rel):
     return stats
 
 
+# Function to get the k best documents of every query (one column per query) from a matrix of scores
+def top_k(scores, k=20, largest=True):
+    if largest:
+        scores = -scores
+    k = min(k, scores.shape[0])
+    # argpartition only separates the k best scores, then we sort those k
+    best = np.argpartition(scores, k - 1, axis=0)[:k]
+    order = np.take_along_axis(scores, best, axis=0).argsort(axis=0, kind="stable")
+    return np.take_along_axis(best, order, axis=0).T + 1
+
+
+# Function to fit the binary, term frequency and TF-IDF weighting schemes once on the documents and transform all the queries
+def get_batch_matrices(corpus, queries):
+    vectorizer = CountVectorizer()
+    tf_docs = vectorizer.fit_transform(corpus).astype(np.float64)
+    tf_queries = vectorizer.transform(queries).astype(np.float64)
+
+    bin_docs = tf_docs.copy()
+    bin_docs.data[:] = 1
+    bin_queries = tf_queries.copy()
+    bin_queries.data[:] = 1
+
+    return {"binary": (bin_docs, bin_queries), "tf": (tf_docs, tf_queries), "tf_idf": (tf_docs, tf_queries)}
+
+
+# Function to calculate cosine and euclidean's values of all the queries at once with sparse matrix products
+def batch_cos_and_euclidean(docs, queries, k=20):
+    dot = (docs @ queries.T).toarray()
+    doc_norms = np.asarray(docs.multiply(docs).sum(axis=1))
+    query_norms = np.asarray(queries.multiply(queries).sum(axis=1)).T
+
+    # COSINE (empty vectors have a similarity of 0, like in sklearn)
+    sim_cos = dot / np.where(doc_norms > 0, np.sqrt(doc_norms), 1) / np.where(query_norms > 0, np.sqrt(query_norms), 1)
+    # EUCLIDEAN
+    sim_eu = np.sqrt(np.maximum(doc_norms + query_norms - 2 * dot, 0))
+
+    return [top_k(sim_cos, k), top_k(sim_eu, k, largest=False)]
+
+
+# Function to calculate the TF-IDF cosine values of all the queries at once.
+# get_matrices() fits the TfidfVectorizer on the documents plus the query, so the query terms get one more document
+# frequency and the documents are normalized with those idf values. We rebuild exactly the same weights with sparse products.
+def batch_tf_idf_cos(tf_docs, tf_queries, k=20):
+    n = tf_docs.shape[0] + 1
+    df = np.bincount(tf_docs.indices, minlength=tf_docs.shape[1])
+    idf = np.log((1 + n) / (1 + df)) + 1
+    idf_query = np.log((1 + n) / (2 + df)) + 1
+
+    query_terms = tf_queries.copy()
+    query_terms.data[:] = 1
+
+    squared_docs = tf_docs.multiply(tf_docs).tocsr()
+    doc_norms = np.asarray(squared_docs @ (idf ** 2))[:, None] + \
+        (squared_docs @ query_terms.multiply(idf_query ** 2 - idf ** 2).T).toarray()
+    weighted_queries = tf_queries.multiply(idf_query).tocsr()
+    dot = (tf_docs @ weighted_queries.multiply(idf_query).T).toarray()
+    query_norms = np.asarray(weighted_queries.multiply(weighted_queries).sum(axis=1)).T
+
+    sim_cos = dot / np.where(doc_norms > 0, np.sqrt(doc_norms), 1) / np.where(query_norms > 0, np.sqrt(query_norms), 1)
+    return top_k(sim_cos, k)
+
+
+# Function to process all the queries at once, fitting every weighting schema only one time
+def batch_processing(corpus, queries, relevant, k=20):
+    matrices = get_batch_matrices(corpus, queries)
+
+    bin_cos, bin_euclid = batch_cos_and_euclidean(*matrices["binary"], k)
+    tf_cos, tf_euclid = batch_cos_and_euclidean(*matrices["tf"], k)
+    tf_idf_cos = batch_tf_idf_cos(*matrices["tf_idf"], k)
+    # Same as processing(), the TF-IDF euclidean column is computed over the binary matrix
+    tf_idf_euclid = bin_euclid
+
+    rows = []
+    for q, rel in enumerate(relevant):
+        stats = []
+        for retrieved in (bin_cos, bin_euclid, tf_cos, tf_euclid, tf_idf_cos, tf_idf_euclid):
+            stats += get_statistics(retrieved[q], rel)
+        rows.append(stats)
+    return rows
+
+
+# Function to read the documents of the cranfield folder
+def read_corpus(folder, size):
+    corpus = []
+    for d in range(size):
+        with open("./cranfield/" + folder + "/" + str(d + 1) + ".txt") as f:
+            corpus.append(f.read())
+    return corpus
+
+
 # Main function to process the data and saving the results/statistics in a csv file
-def main():
+def main(batch=True):
     with open("output.csv", 'w') as file:
         output = csv.writer(file, delimiter=";")
         output.writerow(["query",
@@ -117,17 +207,21 @@ def main():
                          "Tf_idf euclidean precision", "Tf_idf euclidean recall", "Tf_idf euclidean f_measure",
                          ])
 
-        # prepare corpus
-        corpus = []
-        for d in range(1400):
-            f = open("./cranfield/d/" + str(d + 1) + ".txt")
-            corpus.append(f.read())
+        # prepare corpus and queries
+        corpus = read_corpus("d", 1400)
+        queries = read_corpus("q", 225)
+
+        if batch:
+            # all the queries at once
+            relevant = [get_relevant(q) for q in range(len(queries))]
+            for q, stats in enumerate(batch_processing(corpus, queries, relevant)):
+                output.writerow([q + 1] + stats)
+            return
+
         # add query to corpus
-        for q in range(225):
-            f = open("./cranfield/q/" + str(q + 1) + ".txt")
-            # corpus.append(f.read())
+        for q, query in enumerate(queries):
             data = list(corpus)
-            data.append(f.read())
+            data.append(query)
 
             row_builder = [q + 1]
 
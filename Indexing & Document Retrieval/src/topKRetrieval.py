@@ -0,0 +1,155 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Top-k retrieval over the inverted index with MaxScore dynamic pruning for the TF-IDF cosine measure.
+Every query term has an upper bound of the score it can add to a document. The terms are processed from the highest bound: the essential terms
+are decoded whole and accumulated with numpy, until the bounds of the terms left together can't beat the k-th best score.
+The terms left are non essential, they are only looked up for the candidates that can still enter the top-k, and only the blocks of their
+posting lists that can hold those candidates are decoded (skip entries of the index), the other blocks are skipped.
+It returns exactly the same documents as the exhaustive search of the inverted index and counts the documents, postings and blocks decoded.
+Input of the function: index folder made by invertedIndex.py and cranfield folder with the queries
+Output of the function: for every query, the work and the time of MaxScore against the exhaustive search
+"""
+
+
+# imports
+from invertedIndex import load_index, query_terms, get_postings, get_block_postings, best_documents, search
+from main import read_corpus
+import numpy as np
+import argparse
+import time
+
+# relative slack of the upper bounds, so the rounding of the partial scores never prunes a document of the top-k
+BOUND_SLACK = 1 + 1e-9
+
+
+# Function to get the k-th best score of the candidates, 0 while there are less than k candidates
+def kth_score(scores, k):
+    return -np.partition(-scores, k - 1)[k - 1] if len(scores) >= k else 0.0
+
+
+# Function to get the contributions of a term to some documents (sorted) from its decoded postings (sorted), 0 for the documents without the term
+def lookup(postings, documents):
+    term_documents, contributions = postings
+    values = np.zeros(len(documents))
+    if len(term_documents):
+        positions = np.minimum(np.searchsorted(term_documents, documents), len(term_documents) - 1)
+        found = term_documents[positions] == documents
+        values[found] = contributions[positions[found]]
+    return values
+
+
+# Function to score a query with MaxScore, returns the k best documents (starting at 1), their scores and the work done
+def search_max_score(index, query, k=20):
+    terms, counts = query_terms(index, query)
+    stats = {"documents": 0, "postings": 0, "total_postings": 0, "blocks": 0, "total_blocks": 0}
+    if len(terms) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0), stats
+    idf = np.asarray(index["idf"][terms])
+    query_weights = counts * idf
+    weights = (query_weights * idf).tolist()
+    query_norm = 0
+    for weight in query_weights.tolist():
+        query_norm += weight ** 2
+    query_norm = np.sqrt(query_norm)
+    bounds = (query_weights * np.asarray(index["max_scores"][terms]) / query_norm).tolist()
+    norms = index["norms"]
+    first_blocks, last_blocks = np.asarray(index["term_blocks"][terms]).tolist(), np.asarray(index["term_blocks"][terms + 1]).tolist()
+    stats["total_postings"] = int(np.asarray(index["df"][terms]).sum())
+    stats["total_blocks"] = sum(last_blocks) - sum(first_blocks)
+
+    # terms from the highest upper bound, remaining[j] is the best score of a document that only has the terms order[j:]
+    order = sorted(range(len(terms)), key=lambda i: -bounds[i])
+    remaining = (np.append(np.cumsum([bounds[i] for i in order][::-1])[::-1], 0.0) * BOUND_SLACK).tolist()
+    # decoded postings of every term: documents and contributions (all of them for an essential term, the blocks looked up for the others)
+    postings = [None] * len(terms)
+
+    # essential terms: a document that is not a candidate yet may enter the top-k with them, they are accumulated like the exhaustive search
+    # (the documents of the posting lists are not empty, so their norm is not 0)
+    accumulators = np.zeros(len(norms))
+    threshold = 0.0
+    j = 0
+    while j < len(order) and remaining[j] >= threshold:
+        i = order[j]
+        documents, frequencies = get_postings(index, terms[i])
+        postings[i] = (documents, weights[i] * frequencies)
+        accumulators[documents] += postings[i][1]
+        stats["postings"] += len(documents)
+        stats["blocks"] += last_blocks[i] - first_blocks[i]
+        # the k-th best score of the documents of the term is a lower bound of the k-th best score of all the candidates
+        threshold = max(threshold, kth_score(accumulators[documents] / (norms[documents] * query_norm), k))
+        j += 1
+    candidates = np.flatnonzero(accumulators)
+    partial = accumulators[candidates] / (norms[candidates] * query_norm)
+    stats["documents"] = len(candidates)
+
+    # non essential terms: the bound of a candidate is its partial score plus the best weight of the block where every term left could have it,
+    # only the candidates whose bound can still beat the threshold are kept, and only their blocks are decoded
+    rest_terms = order[j:]
+    if rest_terms:
+        keep = partial + remaining[j] >= threshold
+        candidates, partial = candidates[keep], partial[keep]
+        # block of every candidate in every term left: the first block whose last document is not lower, -1 after the last block
+        blocks = np.empty((len(rest_terms), len(candidates)), dtype=np.int64)
+        block_bounds = np.zeros((len(rest_terms), len(candidates)))
+        for row, i in enumerate(rest_terms):
+            blocks[row] = first_blocks[i] + np.searchsorted(index["block_last"][first_blocks[i]:last_blocks[i]], candidates)
+            inside = blocks[row] < last_blocks[i]
+            blocks[row][~inside] = -1
+            block_bounds[row][inside] = index["block_max"][blocks[row][inside]] * (query_weights[i] / query_norm)
+        rest = block_bounds.sum(axis=0)
+        for row, i in enumerate(rest_terms):
+            keep = (partial + rest) * BOUND_SLACK >= threshold
+            if not keep.all():
+                candidates, partial, rest = candidates[keep], partial[keep], rest[keep]
+                blocks, block_bounds = blocks[:, keep], block_bounds[:, keep]
+            # the blocks of the sorted candidates are sorted too, with the -1 of the candidates after the last block at the end
+            needed = blocks[row][blocks[row] >= 0]
+            needed = needed[np.append(True, needed[1:] != needed[:-1])] if len(needed) else needed
+            if len(needed) == last_blocks[i] - first_blocks[i]:
+                documents, frequencies = get_postings(index, terms[i])
+            else:
+                documents, frequencies = get_block_postings(index, terms[i], needed)
+            postings[i] = (documents, weights[i] * frequencies)
+            stats["postings"] += len(documents)
+            stats["blocks"] += len(needed)
+            partial = partial + lookup(postings[i], candidates) / (norms[candidates] * query_norm)
+            rest = rest - block_bounds[row]
+            threshold = max(threshold, kth_score(partial, k))
+        candidates = candidates[partial * BOUND_SLACK >= threshold]
+
+    # the final score adds the terms in the same order as the exhaustive search, so both give the same value
+    scores = np.zeros(len(candidates))
+    for i in range(len(terms)):
+        scores += lookup(postings[i], candidates)
+    scores = scores / (norms[candidates] * query_norm)
+    best = best_documents(candidates, scores, k)
+    return candidates[best] + 1, scores[best], stats
+
+
+# Main function to compare MaxScore with the exhaustive search for every cranfield query
+def main():
+    parser = argparse.ArgumentParser(description="MaxScore top-k search over the inverted index")
+    parser.add_argument("--index", default="index")
+    parser.add_argument("--queries", type=int, default=225)
+    parser.add_argument("-k", type=int, default=20)
+    args = parser.parse_args()
+
+    index = load_index(args.index)
+    print("query;documents evaluated;postings decoded;total postings;blocks decoded;total blocks;maxscore ms;exhaustive ms;same top-k")
+    totals = [0.0, 0.0]
+    for q, query in enumerate(read_corpus("q", args.queries)):
+        start = time.perf_counter()
+        documents, scores, stats = search_max_score(index, query, args.k)
+        middle = time.perf_counter()
+        exhaustive = search(index, query, args.k)[0]
+        end = time.perf_counter()
+        totals[0] += middle - start
+        totals[1] += end - middle
+        print(";".join(str(value) for value in [q + 1, stats["documents"], stats["postings"], stats["total_postings"], stats["blocks"],
+                                                 stats["total_blocks"], round(1000 * (middle - start), 3), round(1000 * (end - middle), 3),
+                                                 np.array_equal(documents, exhaustive)]))
+    print("total;;;;;;" + str(round(1000 * totals[0], 3)) + ";" + str(round(1000 * totals[1], 3)) + ";")
+
+
+if __name__ == '__main__':
+    main()
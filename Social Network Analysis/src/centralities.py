@@ -0,0 +1,85 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Centralities of the nodes of a graph computed on its sparse adjacency matrix, every centrality is computed once and saved.
+Degree and eigenvector centralities are exact, betweenness and closeness are estimated from k sampled pivots when k is given (exact otherwise).
+Input of the function: networkx graph, number of pivots k, seed of the sample and optionally its adjacency matrix (nodes and CSR matrix of CreateAdjacency)
+Output of the function: dictionary node -> centrality, and the top n nodes of a centrality
+"""
+
+import heapq
+import numpy as np
+import networkx as nx
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components, shortest_path
+
+#Class to compute and save the centralities of a graph, the adjacency matrix is built from the graph if it is not given
+#(the one given must be unweighted, every edge with value 1), a graph without nodes has an empty matrix and empty centralities
+class Centralities:
+    def __init__(self, G, k=None, seed=None, adjacency=None):
+        self.G = G
+        if adjacency is None and G.number_of_nodes() == 0:
+            self.nodes = []
+            self.A = sparse.csr_array((0, 0), dtype=np.int64)
+        elif adjacency is None:
+            self.nodes = list(G)
+            self.A = nx.to_scipy_sparse_array(G, nodelist=self.nodes, weight=None, format='csr')
+        else:
+            self.nodes, self.A = adjacency
+        #betweenness and closeness use k pivots only if there are more nodes than pivots
+        self.k = k if k is not None and k < len(self.nodes) else None
+        self.seed = seed
+        self.cache = {}
+
+    #Function to get a centrality, it is computed the first time only
+    def get(self, name):
+        if name not in self.cache:
+            self.cache[name] = getattr(self, 'compute_' + name)() if self.nodes else {}
+        return self.cache[name]
+
+    def as_dict(self, values):
+        return dict(zip(self.nodes, values.tolist()))
+
+    #Degree centrality: degree of the node divided by n-1
+    def compute_degree(self):
+        n = len(self.nodes)
+        degrees = np.asarray(self.A.sum(axis=1)).ravel()
+        return self.as_dict(degrees * (1.0 / (n - 1)) if n > 1 else np.ones(n))
+
+    #Eigenvector centrality with the same power iteration as networkx (on A+I, normalized, from a uniform vector), done with sparse products
+    def compute_eigenvector(self, max_iter=100, tol=1.0e-6):
+        n = len(self.nodes)
+        x = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            xlast = x
+            x = xlast + self.A.T @ xlast
+            norm = np.linalg.norm(x) or 1
+            x = x / norm
+            if np.abs(x - xlast).sum() < n * tol:
+                return self.as_dict(x)
+        raise nx.PowerIterationFailedConvergence(max_iter)
+
+    #Betweenness centrality, with k pivots only the shortest paths from k sampled sources are counted (Brandes pivot sampling)
+    def compute_betweenness(self):
+        return nx.betweenness_centrality(self.G, k=self.k, seed=self.seed)
+
+    #Closeness centrality as in networkx (scaled by the size of the component of the node), with k pivots the distance of a node
+    #to the other nodes of its component is estimated from its mean distance to the sampled pivots of that component
+    def compute_closeness(self):
+        if self.k is None:
+            return nx.closeness_centrality(self.G)
+        n = len(self.nodes)
+        pivots = np.random.default_rng(self.seed).choice(n, self.k, replace=False)
+        distances = shortest_path(self.A, unweighted=True, indices=pivots)
+        reachable = np.isfinite(distances) & (distances > 0)
+        count = reachable.sum(axis=0)
+        mean = np.where(reachable, distances, 0).sum(axis=0) / np.maximum(count, 1)
+        _, labels = connected_components(self.A, directed=False)
+        size = np.bincount(labels)[labels]
+        closeness = np.zeros(n)
+        found = count > 0
+        closeness[found] = (size[found] - 1) / (n - 1) / mean[found]
+        return self.as_dict(closeness)
+
+    #Function to get the n nodes with the highest centrality, in the same order as a full sort
+    def top(self, name, n=10):
+        return heapq.nlargest(n, self.get(name).items(), key=lambda item: item[1])
@@ -0,0 +1,43 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Community detection of a graph with Louvain, label propagation or k-clique percolation (the first version of the analysis),
+the communities are computed once and give the community of every node, the modularity of the partition and the time of the detection.
+Input of the function: networkx graph, method and seed
+Output of the function: Communities with the dictionary node -> community (from 1, 0 for the nodes without community), modularity and seconds
+"""
+
+import time
+import networkx as nx
+
+#Function to get the communities of the graph with the method given, as a list of sets of nodes
+def find_communities(G, method, seed=0):
+    if method == "louvain":
+        return nx.community.louvain_communities(G, seed=seed)
+    if method == "label_propagation":
+        return list(nx.community.label_propagation_communities(G))
+    if method == "k_clique":
+        return list(nx.community.k_clique_communities(G, 3))
+    raise ValueError("unknown method: " + str(method))
+
+#Class with the communities of a graph, with a fixed seed by default so Louvain gives the same communities in every run
+class Communities:
+    def __init__(self, G, method="louvain", seed=0):
+        self.method = method
+        start = time.perf_counter()
+        communities = find_communities(G, method, seed)
+        self.seconds = time.perf_counter() - start
+        self.communities = {node: cid + 1 for cid, community in enumerate(communities) for node in community}
+        #the k-clique communities can overlap and leave nodes out, the modularity is the one of the partition with a community per node
+        #(the last one of the node) and a single community for every node left out
+        partition = {}
+        for node in G:
+            partition.setdefault(self.communities.get(node, ('none', node)), set()).add(node)
+        self.modularity = nx.community.modularity(G, partition.values()) if G.number_of_edges() else 0.0
+
+    #Community of a node, 0 if it has no community
+    def __getitem__(self, node):
+        return self.communities.get(node, 0)
+
+    #Function to get the community of every node of the graph, 0 for the nodes without community
+    def communities_of(self, G):
+        return {node: self[node] for node in G}
@@ -0,0 +1,112 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Export of the graphs with the attributes of the nodes (communities, centralities), the GEXF file is written node by node
+and edge by edge instead of building the XML document in memory, and the binary format is a directory of .npy files with the nodes,
+the CSR adjacency matrix (the value of an edge is its weight) and one array per attribute, that can be loaded back with memory mapping.
+The attributes of the last export are listed in attributes.json, so the arrays of an older export in the same directory are not loaded back.
+Input of the function: networkx graph, a dictionary attribute name -> (dictionary node -> value) and optionally its adjacency matrix (nodes and CSR matrix)
+Output of the function: GEXF file and directory with nodes.npy, indptr.npy, indices.npy, weights.npy, <attribute>.npy and attributes.json
+"""
+
+import os
+import json
+import numbers
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+import networkx as nx
+from scipy import sparse
+
+#Function to get the GEXF type of the values of an attribute
+def gexf_type(values):
+    values = list(values)
+    if all(isinstance(value, numbers.Integral) for value in values):
+        return "integer"
+    if all(isinstance(value, numbers.Real) for value in values):
+        return "double"
+    return "string"
+
+#Function to write a graph in a GEXF file line by line, with the attributes given for every node and the weight of the edges
+def write_gexf(G, path, attributes=None):
+    attributes = attributes or {}
+    names = list(attributes)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        f.write('<gexf xmlns="http://www.gexf.net/1.2draft" version="1.2">\n')
+        f.write('  <graph defaultedgetype="undirected" mode="static">\n')
+        f.write('    <attributes class="node" mode="static">\n')
+        for i, name in enumerate(names):
+            values = attributes[name]
+            f.write('      <attribute id="%d" title=%s type="%s" />\n' % (i, quoteattr(name), gexf_type(values[node] for node in G)))
+        f.write('    </attributes>\n')
+        f.write('    <nodes>\n')
+        for node in G:
+            node_id = quoteattr(str(node))
+            if names:
+                f.write('      <node id=%s label=%s>\n        <attvalues>\n' % (node_id, node_id))
+                for i, name in enumerate(names):
+                    f.write('          <attvalue for="%d" value=%s />\n' % (i, quoteattr(str(attributes[name][node]))))
+                f.write('        </attvalues>\n      </node>\n')
+            else:
+                f.write('      <node id=%s label=%s />\n' % (node_id, node_id))
+        f.write('    </nodes>\n')
+        f.write('    <edges>\n')
+        for i, (u, v, weight) in enumerate(G.edges(data="weight", default=1)):
+            f.write('      <edge id="%d" source=%s target=%s weight="%s" />\n' % (i, quoteattr(str(u)), quoteattr(str(v)), escape(str(weight))))
+        f.write('    </edges>\n')
+        f.write('  </graph>\n')
+        f.write('</gexf>\n')
+
+#Function to save a graph in a directory of .npy files: the nodes, the CSR adjacency matrix and one array per attribute,
+#the names of the attributes are written in attributes.json and the .npy files of the attributes of an older export are removed,
+#the adjacency matrix is built from the graph if it is not given
+def write_npy(G, directory, attributes=None, adjacency=None):
+    attributes = attributes or {}
+    os.makedirs(directory, exist_ok=True)
+    if adjacency is None:
+        nodes = list(G)
+        A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight="weight", format="csr") if nodes else sparse.csr_array((0, 0), dtype=np.int64)
+    else:
+        nodes, A = adjacency
+    np.save(os.path.join(directory, "nodes.npy"), np.array([str(node) for node in nodes]))
+    np.save(os.path.join(directory, "indptr.npy"), A.indptr)
+    np.save(os.path.join(directory, "indices.npy"), A.indices)
+    np.save(os.path.join(directory, "weights.npy"), A.data)
+    for name, values in attributes.items():
+        np.save(os.path.join(directory, name + ".npy"), np.array([values[node] for node in nodes]))
+    for name in set(read_manifest(directory)) - set(attributes):
+        path = os.path.join(directory, name + ".npy")
+        if os.path.exists(path):
+            os.remove(path)
+    with open(os.path.join(directory, "attributes.json"), "w") as f:
+        json.dump(list(attributes), f)
+
+#Function to get the names of the attributes of the graph saved in a directory, from attributes.json
+def read_manifest(directory):
+    path = os.path.join(directory, "attributes.json")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+#Function to load a graph saved with write_npy, with mmap=True the arrays are memory mapped and only the pages used are read
+#returns the nodes, the CSR adjacency matrix and the dictionary attribute name -> array (in the order of the nodes)
+def load_npy(directory, mmap=True):
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode=mode)
+              for name in ["nodes", "indptr", "indices", "weights"] + read_manifest(directory)}
+    nodes = arrays.pop("nodes")
+    A = sparse.csr_array((arrays.pop("weights"), arrays.pop("indices"), arrays.pop("indptr")), shape=(len(nodes), len(nodes)))
+    return nodes, A, arrays
+
+#Function to build the networkx graph of a graph saved with write_npy, with its attributes
+def load_graph(directory):
+    nodes, A, attributes = load_npy(directory)
+    G = nx.relabel_nodes(nx.from_scipy_sparse_array(A), dict(enumerate(nodes.tolist())))
+    for name, values in attributes.items():
+        nx.set_node_attributes(G, dict(zip(nodes.tolist(), values.tolist())), name)
+    return G
+
+#Function to export a graph in the GEXF file name.gexf and in the directory name/ of .npy files
+def export(G, name, attributes=None, adjacency=None):
+    write_gexf(G, name + ".gexf", attributes)
+    write_npy(G, name, attributes, adjacency)
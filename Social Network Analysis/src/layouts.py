@@ -0,0 +1,88 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Layout and rendering of the graphs without a display, the positions of a graph are computed once and saved on disk
+with the hash of the graph, so drawing the graph again (for example with other colours) only reads them.
+The layout is SFDP of graphviz when it is installed, otherwise the sparse spring layout or ForceAtlas2 of networkx.
+The nodes and the edges are drawn with one matplotlib collection each, the labels only on small graphs.
+Input of the function: networkx graph, layout method and colour of every node
+Output of the function: positions of the nodes and png files
+"""
+
+import hashlib
+import json
+import os
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+import numpy as np
+import networkx as nx
+
+#Graphs with more nodes than this are drawn without labels
+LABEL_LIMIT = 100
+
+#Function to get a hash of the nodes and the edges of a graph, the same graph gives the same hash whatever the order of the file
+def graph_hash(G):
+    h = hashlib.sha1()
+    h.update(json.dumps(sorted(map(str, G))).encode('utf-8'))
+    h.update(json.dumps(sorted(sorted(map(str, edge)) for edge in G.edges())).encode('utf-8'))
+    return h.hexdigest()
+
+#Function to compute the positions of the nodes with the method given: "sfdp", "spring" or "forceatlas2", by default sfdp if graphviz is installed
+def compute_layout(G, method=None, seed=0):
+    if method in (None, "sfdp"):
+        try:
+            from networkx.drawing.nx_agraph import graphviz_layout
+            return graphviz_layout(G, prog="sfdp")
+        except ImportError:
+            if method == "sfdp":
+                raise
+            method = "spring"
+    if method == "spring":
+        #for graphs of 500 nodes or more networkx uses the sparse adjacency matrix
+        return nx.spring_layout(G, seed=seed)
+    if method == "forceatlas2":
+        return nx.forceatlas2_layout(G, seed=seed)
+    raise ValueError("unknown layout: " + str(method))
+
+#Function to get the positions of the nodes, from the cache directory if the same graph was already drawn
+def layout(G, method=None, cache_dir="layouts"):
+    path = os.path.join(cache_dir, graph_hash(G) + "-" + str(method) + ".json")
+    if os.path.exists(path):
+        with open(path) as f:
+            positions = json.load(f)
+        return {node: positions[str(node)] for node in G}
+    pos = compute_layout(G, method)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump({str(node): [float(x) for x in pos[node]] for node in G}, f)
+    os.replace(path + ".tmp", path)
+    return pos
+
+#Function to draw a graph in the axes given, with the colour of every node
+def draw(G, pos, ax, node_color=None, cmap=None, node_size=None, title=None):
+    nodes = list(G)
+    xy = np.array([pos[node] for node in nodes]).reshape(-1, 2)
+    ax.add_collection(LineCollection([(pos[u], pos[v]) for u, v in G.edges()], colors="grey", linewidths=0.5, zorder=1))
+    if node_size is None:
+        node_size = 300 if len(nodes) <= LABEL_LIMIT else 10
+    ax.scatter(xy[:, 0], xy[:, 1], c=node_color, cmap=cmap, s=node_size, zorder=2)
+    if len(nodes) <= LABEL_LIMIT and node_size >= 100:
+        for node, (x, y) in zip(nodes, xy):
+            ax.text(x, y, str(node), ha="center", va="center", fontsize=8, zorder=3)
+    ax.autoscale()
+    ax.set_axis_off()
+    if title:
+        ax.set_title(title)
+
+#Function to draw several panels of the same positions in a png file, every panel is (title, colours, colour map)
+def render(G, pos, file, panels, node_size=None):
+    columns = min(len(panels), 2)
+    rows = (len(panels) + columns - 1) // columns
+    fig, axes = plt.subplots(rows, columns, figsize=(8 * columns, 8 * rows), squeeze=False)
+    for ax, (title, node_color, cmap) in zip(axes.ravel(), panels):
+        draw(G, pos, ax, node_color, cmap, node_size, title)
+    for ax in axes.ravel()[len(panels):]:
+        ax.set_axis_off()
+    fig.savefig(file)
+    plt.close(fig)
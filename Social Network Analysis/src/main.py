@@ -2,15 +2,20 @@
 Author: Francisco Medel Molinero
 Description of the script: This script creates a graph based on a csv file and gives us information like general statistics, communities, centralities, and different ways to visualize the data
 Input of the function: data in csv format
-Output of the function: centralities.png, communities.png, components.png, Graph.gexf and Subgraph.gexf
+Output of the function: centralities.png, communities.png, components.png, Graph.gexf and Subgraph.gexf, Graph/ and Subgraph/ (.npy files)
 """
 
 import networkx as nx
-from networkx.drawing.nx_agraph import graphviz_layout
-import matplotlib.pyplot as plt
 import csv
+import numpy as np
 import scipy as sp
-from itertools import islice
+from scipy import sparse
+from collections import Counter
+from itertools import combinations, islice
+from centralities import Centralities
+from communities import Communities
+from layouts import layout, render
+from exports import export
 
 #Function to read a file and convert the data
 def read_file(file):
@@ -22,31 +27,56 @@ def read_file(file):
             text.append(row)
     return text
 
-#This function creates a graph
-def CreateGraph(data):
-    Graph=nx.Graph()
+#Function to group the actors of every film in one pass, every actor appears once per film, only the actors accepted by actor_filter are kept
+def FilmActors(data, actor_filter=None):
     pelis_actores = {}
-    for index, line in enumerate(data):
-        # Node per actor creation
-        Graph.add_node(data[index][2])
-
-        # if the film isn't in the dictionary, we add the film and the actor
-        if data[index][1] not in pelis_actores:
-            pelis_actores[data[index][1]] = [[data[index][2]]]
-        # if not, we add the actor to the actor's list of the film
-        else:
-            pelis_actores[data[index][1]].append([data[index][2]])
-        pelis_actores[data[index][1]] = [''.join(ele) for ele in pelis_actores[data[index][1]]]
-
-        # if films[1] not in film_actors:
-        #   film_actors[films[1]] = film_actors[films[1]].append(films[2])
-    for film, actorList in pelis_actores.items():
-        for actor1 in actorList:
-            for actor2 in actorList:
-                if actor1 != actor2:
-                    Graph.add_edge(actor1, actor2)
+    for line in data:
+        if actor_filter is None or actor_filter(line[2]):
+            pelis_actores.setdefault(line[1], {})[line[2]] = None
+    return {film: list(actors) for film, actors in pelis_actores.items()}
+
+#Function to count the films of every pair of co-stars, every unordered pair of actors of a film is counted once
+def CoStarPairs(pelis_actores):
+    pairs = Counter()
+    for actorList in pelis_actores.values():
+        pairs.update(combinations(sorted(actorList), 2))
+    return pairs
+
+#This function creates a graph, with weighted=True the weight of an edge is the number of films of the two actors
+def CreateGraph(data, weighted=False, actor_filter=None):
+    Graph=nx.Graph()
+    # Node per actor creation, in the order of the file
+    Graph.add_nodes_from(line[2] for line in data if actor_filter is None or actor_filter(line[2]))
+    pairs = CoStarPairs(FilmActors(data, actor_filter))
+    if weighted:
+        Graph.add_weighted_edges_from((actor1, actor2, films) for (actor1, actor2), films in pairs.items())
+    else:
+        Graph.add_edges_from(pairs)
     return Graph
 
+#This function creates the sparse (CSR) adjacency matrix of the graph, with the actors in the order of CreateGraph, used by the centralities and
+#the .npy export. With weighted=True the value of an edge is the number of films of the two actors (1 otherwise, like the edges of CreateGraph)
+#the pairs of every film are the upper triangle of its actors, so no pair is built in python
+def CreateAdjacency(data, weighted=True, actor_filter=None):
+    pelis_actores = FilmActors(data, actor_filter)
+    actors = {}
+    for line in data:
+        if actor_filter is None or actor_filter(line[2]):
+            actors.setdefault(line[2], len(actors))
+    rows, columns = [], []
+    for actorList in pelis_actores.values():
+        ids = np.sort(np.array([actors[actor] for actor in actorList], dtype=np.int64))
+        upper = np.triu_indices(len(ids), 1)
+        rows.append(ids[upper[0]])
+        columns.append(ids[upper[1]])
+    rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+    #the repeated pairs are added up when the matrix is converted to CSR
+    upper = sparse.coo_matrix((np.ones(len(rows), dtype=np.int64), (rows, columns)), shape=(len(actors), len(actors))).tocsr()
+    if not weighted:
+        upper.data[:] = 1
+    return list(actors), upper + upper.T
+
 #This function shows the number of nodes, edges, density and the components  of a graph
 def GeneralStatistics(G):
     num_nodes=len(G.nodes())
@@ -63,110 +93,83 @@ def take(n, iterable):
     "Return first n items of the iterable as a list"
     return list(islice(iterable, n))
 
-#This function gets top 10 centralities
-def TopCentralities(G):
-    degree_centr=nx.degree_centrality(G)
-    eigenvector_centr=nx.eigenvector_centrality(G)
-    degree_sorted=dict(sorted(degree_centr.items(), key=lambda item: item[1], reverse=True))
-    eigenvector_sorted=dict(sorted(eigenvector_centr.items(), key=lambda item: item[1], reverse=True))
-    top_degree_centr=take(10, degree_sorted.items())
-    top_eigenvector_centr=take(10, eigenvector_sorted.items())
+#This function gets top 10 centralities, computed on the sparse adjacency matrix and selected with a heap
+def TopCentralities(G, centralities=None):
+    centralities = centralities or Centralities(G)
+    top_degree_centr=centralities.top('degree')
+    top_eigenvector_centr=centralities.top('eigenvector')
     print("top 10 key players using degree centrality: "+ str(top_degree_centr))
     print("top 10 key players using eigenvector centrality: "+ str(top_eigenvector_centr))
 
-#This function gets top 10 communities
-def TopCommunities(G):
-    communities = {node: cid + 1 for cid, community in enumerate(nx.algorithms.community.k_clique_communities(G, 3)) for
-                   node in community}
-    communities_sorted = dict(sorted(communities.items(), key=lambda item: item[1], reverse=True))
+#This function gets top 10 communities and the modularity and time of the detection
+def TopCommunities(G, communities=None):
+    communities = communities or Communities(G)
+    communities_sorted = dict(sorted(communities.communities.items(), key=lambda item: item[1], reverse=True))
     top_communities = take(10, communities_sorted.items())
     print("top 10 communities: " + str(top_communities))
+    print("Communities (" + communities.method + "): modularity " + str(communities.modularity) + ", " + str(communities.seconds) + " seconds")
 
-#This function helps us to visualize centralities and communities of the graph
-def Visualize(G):
-    # Communities
-    communities = {node: cid + 1 for cid, community in enumerate(nx.algorithms.community.k_clique_communities(G, 3)) for
-                   node in community}
+#This function helps us to visualize centralities and communities of the graph, with k the betweenness and closeness are estimated from k pivots
+#one layout is computed (or read from the cache of layouts) and every png file is drawn from it
+def Visualize(G, k=None, communities=None, method=None, centralities=None):
+    pos = layout(G, method)
 
-    pos = graphviz_layout(G, prog="fdp")
-    nx.draw(G, pos,
-            labels={v: str(v) for v in G},
-            cmap=plt.get_cmap("rainbow"),
-            node_color=[communities[v] if v in communities else 0 for v in G])
-    plt.savefig("communities.png")
-    plt.show()
+    # Communities
+    communities = communities or Communities(G)
+    render(G, pos, "communities.png", [(None, [communities[v] for v in G], "rainbow")])
 
     #Centralities
-    pos = graphviz_layout(G, prog="fdp")
-    centralities = [ nx.degree_centrality,nx.closeness_centrality,
- nx.betweenness_centrality]
-    region = 220
-    for centrality in centralities:
-        region += 1
-        plt.subplot(region)
-        plt.title(centrality.__name__)
-        nx.draw(G, pos, labels={v: str(v) for v in G},
-                cmap=plt.get_cmap("bwr"), node_color=[centrality(G)[k] for k in centrality(G)])
-    plt.savefig("centralities.png")
-    plt.show()
+    centralities = centralities or Centralities(G, k)
+    render(G, pos, "centralities.png", [(centrality + '_centrality', [centralities.get(centrality)[v] for v in G], "bwr")
+                                        for centrality in ['degree', 'closeness', 'betweenness']])
+
     #Components
-    plt.clf()
-    pos = graphviz_layout(G)
-    nx.draw(G, pos, with_labels=False, node_size=10)
-    plt.savefig("components.png")
-    plt.show()
+    render(G, pos, "components.png", [(None, None, None)], node_size=10)
 
-#This function creates a graph based on the data
+#Filter of the actors of the subgraph, only the actors with a name of 8 characters
+def SubgraphActor(actor):
+    return len(actor) == 8
+
+#This function creates a graph based on the data, only with the actors with a name of 8 characters
 def CreateSubgraph(data):
-    subGraph=nx.Graph()
-    pelis_actores = {}
-    for index, line in enumerate(data):
-        if len(data[index][2])==8:
-            # Node per actor creation
-            subGraph.add_node(data[index][2])
-
-            # if the film isn't in the dictionary, we add the film and the actor
-            if data[index][1] not in pelis_actores:
-                pelis_actores[data[index][1]] = [[data[index][2]]]
-            # if not, we add the actor to the actor's list of the film
-            else:
-                pelis_actores[data[index][1]].append([data[index][2]])
-            pelis_actores[data[index][1]] = [''.join(ele) for ele in pelis_actores[data[index][1]]]
-
-        # if films[1] not in film_actors:
-        #   film_actors[films[1]] = film_actors[films[1]].append(films[2])
-    for film, actorList in pelis_actores.items():
-        for actor1 in actorList:
-            for actor2 in actorList:
-                if actor1 != actor2:
-                    subGraph.add_edge(actor1, actor2)
-    return subGraph
-
-#Main function
-def SocialNetworkAnalysis(file):
+    return CreateGraph(data, actor_filter=SubgraphActor)
+
+#Main function, with k the betweenness and closeness of the visualization are estimated from k pivots,
+#method is the community detection: "louvain", "label_propagation" or "k_clique", layout_method the layout: "sfdp", "spring" or "forceatlas2"
+#and seed the seed of Louvain (the same seed gives the same communities)
+def SocialNetworkAnalysis(file, k=None, method="louvain", layout_method=None, seed=0):
     #Load the data
     data=read_file(file)
 
-    #Graph creation
+    #Graph creation, with its adjacency matrix for the centralities and the .npy files
     G = CreateGraph(data)
+    adjacency = CreateAdjacency(data, weighted=False)
 
     #Social Network Analysis
     GeneralStatistics(G)
 
     #Centralities
-    TopCentralities(G)
+    centralities = Centralities(G, adjacency=adjacency)
+    TopCentralities(G, centralities)
 
-    #Communities
-    TopCommunities(G)
+    #Communities, computed once for the report, the colours and the exported files
+    communities = Communities(G, method, seed)
+    TopCommunities(G, communities)
 
     #Visualization
     #We create a subgraph for the visualization, this graph only contains films with 8 of actors
     subGraph=CreateSubgraph(data)
-    Visualize(subGraph)
-
-    # write graph and subgraph to GEXF
-    nx.write_gexf(G, "Graph.gexf")
-    nx.write_gexf(subGraph, "Subgraph.gexf")
-
-file='casts.csv'
-SocialNetworkAnalysis(file)
\ No newline at end of file
+    subAdjacency = CreateAdjacency(data, weighted=False, actor_filter=SubgraphActor)
+    subCommunities = Communities(subGraph, method, seed)
+    subCentralities = Centralities(subGraph, k, adjacency=subAdjacency)
+    Visualize(subGraph, k, subCommunities, layout_method, subCentralities)
+
+    # write graph and subgraph to GEXF and .npy files, with the communities and the centralities of the nodes
+    export(G, "Graph", {'community': communities.communities_of(G), 'degree': centralities.get('degree'),
+                        'eigenvector': centralities.get('eigenvector')}, adjacency)
+    export(subGraph, "Subgraph", {'community': subCommunities.communities_of(subGraph), 'degree': subCentralities.get('degree'),
+                                  'closeness': subCentralities.get('closeness'), 'betweenness': subCentralities.get('betweenness')}, subAdjacency)
+
+if __name__ == '__main__':
+    file='casts.csv'
+    SocialNetworkAnalysis(file)
@@ -0,0 +1,123 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Compact output of the POS and NER tagging, instead of the list of (token, tag) and the whole chunk tree every document is
+one json line with the ids of the tags, the position of the tokens in the text, the entity spans (first token, last token + 1, id of the label)
+and the dictionary entity -> label of extractEntities() (entities.py). The tags and labels are interned, the list of them is written in <output>.vocab.json.
+The position of a token is the gap from the end of the previous token and its length, so the numbers are small, and a file ending in .gz is compressed.
+Input of the function: id and text of a document, its POS tags and its NER chunk tree
+Output of the function: json lines file and vocabulary file
+"""
+
+# Imports
+import gzip
+import json
+
+import nltk
+
+# Quotes that word_tokenize writes in another way
+QUOTES = {'``': '"', "''": '"'}
+
+
+# Function to get the position of the tokens in the text: gap from the end of the previous token and length,
+# the tokens that are not written in the same way in the text (quotes, or not found with gap and length 0) are returned apart,
+# by the number of the token as a string like the keys of a json object, so a record read from the file and a new one are the same
+def token_offsets(text, tokens):
+    gaps, lengths, unaligned = [], [], {}
+    position = 0
+    for i, token in enumerate(tokens):
+        written = token
+        start = text.find(token, position)
+        if start < 0 and token in QUOTES:
+            written = QUOTES[token]
+            start = text.find(written, position)
+        if written != token or start < 0:
+            unaligned[str(i)] = token
+        if start < 0:
+            gaps.append(0)
+            lengths.append(0)
+            continue
+        gaps.append(start - position)
+        lengths.append(len(written))
+        position = start + len(written)
+    return gaps, lengths, unaligned
+
+
+# Function to open a compact file, compressed if its name ends in .gz
+def open_file(path, mode):
+    return gzip.open(path, mode + 't') if path.endswith('.gz') else open(path, mode)
+
+
+# Function to get the spans of the entities of a chunk tree: first token, last token + 1 and label
+def entity_spans(ne_chunked):
+    spans = []
+    position = 0
+    for entity in ne_chunked:
+        if isinstance(entity, nltk.tree.Tree):
+            length = len(entity.leaves())
+            spans.append((position, position + length, entity.label()))
+            position += length
+        else:
+            position += 1
+    return spans
+
+
+# Function to build the compact record of a document, the tags and labels are still strings (they are interned by the writer)
+def compact_record(doc_id, text, tagged, ne_chunked, entities):
+    gaps, lengths, unaligned = token_offsets(text, [token for token, tag in tagged])
+    return {'id': doc_id, 'tags': [tag for token, tag in tagged], 'gaps': gaps, 'lengths': lengths, 'unaligned': unaligned,
+            'entities': entity_spans(ne_chunked), 'entity_dict': entities}
+
+
+# Class to write the compact records, with the tags and labels replaced by their ids
+class CompactWriter:
+    def __init__(self, path):
+        self.path = path
+        self.file = open_file(path, 'w')
+        self.vocabulary = {}
+
+    def intern(self, tag):
+        return self.vocabulary.setdefault(tag, len(self.vocabulary))
+
+    def write(self, record):
+        record = dict(record)
+        record['tags'] = [self.intern(tag) for tag in record['tags']]
+        record['entities'] = [(start, end, self.intern(label)) for start, end, label in record['entities']]
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        with open(self.path + '.vocab.json', 'w') as f:
+            json.dump(list(self.vocabulary), f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Function to read a compact file, the tags and labels of every record are given back as strings
+def read_compact(path):
+    with open(path + '.vocab.json') as f:
+        vocabulary = json.load(f)
+    with open_file(path, 'r') as f:
+        for line in f:
+            record = json.loads(line)
+            record['tags'] = [vocabulary[tag] for tag in record['tags']]
+            record['entities'] = [(start, end, vocabulary[label]) for start, end, label in record['entities']]
+            yield record
+
+
+# Function to get the (token, tag) list of a compact record from the text of the document
+def tagged_tokens(record, text):
+    unaligned = record['unaligned']
+    tokens = []
+    position = 0
+    for i, (gap, length, tag) in enumerate(zip(record['gaps'], record['lengths'], record['tags'])):
+        start = position + gap
+        tokens.append((unaligned.get(str(i), text[start:start + length]), tag))
+        position = start + length
+    return tokens
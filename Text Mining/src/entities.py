@@ -0,0 +1,23 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Named entities of the NER chunk tree of nltk, shared by the text processor and the pipeline of documents.
+The module only imports nltk, so the processes of the pipeline do not need any corpus of nltk (stopwords) to import it.
+Input of the function: NER chunk tree of a text (nltk.ne_chunk)
+Output of the function: dictionary entity -> label
+"""
+
+# Imports
+import nltk
+
+
+# Named Entity Recognition
+def extractEntities(ne_chunked):
+    data = {}
+    for entity in ne_chunked:
+        if isinstance(entity, nltk.tree.Tree):
+            text = " ".join([word for word, tag in entity.leaves()])
+            ent = entity.label()
+            data[text] = ent
+        else:
+            continue
+    return data
@@ -0,0 +1,152 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Knowledge lookup layer of the entity processor, it gets the summary and the first sentence of the summary of every entity.
+The summaries come from a pluggable backend: wikipedia (online) or a local dump of abstracts (offline, one json line per page, indexed by title),
+they are kept in a persistent cache (sqlite) with a time to live and a maximum number of entries (the least recently used ones are removed),
+and the entities that are not in the cache are looked up concurrently with a bounded number of threads.
+Input of the function: list of entities
+Output of the function: dictionary entity -> {"summary", "first_sentence", "option"} ("option" is the first page of a disambiguation), None if not found
+"""
+
+# Imports
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Function to get the first sentence of a summary
+def first_sentence(summary):
+    return ' '.join(re.split(r'(?<=[.:;])\s', summary)[:1])
+
+
+# Function to build the entry of an entity from its summary
+def make_entry(summary=None, option=None):
+    return {'summary': summary, 'first_sentence': first_sentence(summary) if summary is not None else None, 'option': option}
+
+
+# Backend that gets the summaries from wikipedia
+class WikipediaBackend:
+    def __init__(self):
+        import wikipedia
+        self.wikipedia = wikipedia
+
+    def lookup(self, key):
+        try:
+            return make_entry(self.wikipedia.page(key).summary)
+        except self.wikipedia.exceptions.DisambiguationError as e:
+            return make_entry(option=e.options[0])
+        except self.wikipedia.exceptions.PageError:
+            return None
+
+
+# Backend that gets the summaries from a local dump of abstracts, a json lines file with the fields "title" and "abstract".
+# The byte offset of every title is indexed once (and saved in <dump>.idx), then a lookup is a dictionary access and a seek
+class LocalAbstractsBackend:
+    def __init__(self, path):
+        self.path = path
+        index_path = path + '.idx'
+        if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(path):
+            with open(index_path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {}
+            with open(path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    if line.strip():
+                        self.index.setdefault(self.normalize(json.loads(line)['title']), offset)
+                    offset += len(line)
+            with open(index_path, 'w') as f:
+                json.dump(self.index, f)
+        self.local = threading.local()
+
+    # The titles are compared without case and with the underscores as spaces
+    @staticmethod
+    def normalize(title):
+        return ' '.join(title.replace('_', ' ').split()).casefold()
+
+    def lookup(self, key):
+        offset = self.index.get(self.normalize(key))
+        if offset is None:
+            return None
+        # Every thread has its own handle of the dump
+        if not hasattr(self.local, 'file'):
+            self.local.file = open(self.path, 'rb')
+        self.local.file.seek(offset)
+        return make_entry(json.loads(self.local.file.readline())['abstract'])
+
+
+# Persistent cache of the entries in sqlite, the entries older than ttl seconds are looked up again and
+# when there are more than max_entries the least recently used ones are removed
+class SummaryCache:
+    def __init__(self, path='knowledge_cache.sqlite', ttl=30 * 24 * 3600, max_entries=100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, entry TEXT, created REAL, used REAL)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+        self.hits = 0
+        self.misses = 0
+
+    # Function to get the entries of the keys that are in the cache, the entry of a page that does not exist is None
+    def get_many(self, keys):
+        now = time.time()
+        found = {}
+        with self.lock:
+            for key in keys:
+                row = self.connection.execute('SELECT entry, created FROM entries WHERE key = ?', (key,)).fetchone()
+                if row and now - row[1] < self.ttl:
+                    found[key] = json.loads(row[0])
+            self.connection.executemany('UPDATE entries SET used = ? WHERE key = ?', [(now, key) for key in found])
+            self.connection.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries):
+        now = time.time()
+        with self.lock:
+            self.connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                                        [(key, json.dumps(entry), now, now) for key, entry in entries.items()])
+            extra = self.connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.max_entries
+            if extra > 0:
+                self.connection.execute('DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used LIMIT ?)', (extra,))
+            self.connection.commit()
+
+    def hit_rate(self):
+        return self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0
+
+    def close(self):
+        self.connection.close()
+
+
+# Class to look up entities: first in the cache, then the missing ones in the backend with at most max_workers lookups at the same time
+class KnowledgeLookup:
+    def __init__(self, backend, cache=None, max_workers=8):
+        self.backend = backend
+        self.cache = cache
+        self.max_workers = max_workers
+
+    # Function to look up an entity in the backend, an error (for example of the network) is not saved in the cache
+    def safe_lookup(self, key):
+        try:
+            return True, self.backend.lookup(key)
+        except Exception:
+            return False, None
+
+    def lookup_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        entries = self.cache.get_many(keys) if self.cache else {}
+        missing = [key for key in keys if key not in entries]
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = dict(zip(missing, pool.map(self.safe_lookup, missing)))
+            if self.cache:
+                self.cache.put_many({key: entry for key, (ok, entry) in results.items() if ok})
+            entries.update((key, entry) for key, (ok, entry) in results.items())
+        return {key: entries[key] for key in keys}
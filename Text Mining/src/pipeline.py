@@ -0,0 +1,129 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: NLP pipeline for collections of documents, the documents of a directory (.txt files) or of a json lines file ("id" and "text")
+are read one by one and processed in batches by a pool of processes: sentence splitting, tokenization, POS tagging and NER.
+The tagger is loaded once in every process, the results are written to a json lines file as soon as every batch is done, and the speed is reported.
+Input of the function: directory or json lines file of documents
+Output of the function: json lines file with one record per document: id, number of sentences, POS tags and named entities,
+with compact=True the compact records of compact.py (ids of the tags, token offsets and entity spans)
+"""
+
+# Imports
+import argparse
+import json
+import os
+import time
+from functools import partial
+from multiprocessing import Pool
+
+import nltk
+from nltk.tag.perceptron import PerceptronTagger
+from entities import extractEntities
+from compact import CompactWriter, compact_record
+
+# Tagger of the process, loaded once by init_worker
+tagger = None
+
+
+# Function to read the documents of a directory or of a json lines file one by one, as (id, text)
+def iter_documents(source):
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith('.txt'):
+                with open(os.path.join(source, name), 'r') as f:
+                    yield name, f.read()
+    else:
+        with open(source, 'r') as f:
+            for number, line in enumerate(f):
+                if line.strip():
+                    document = json.loads(line)
+                    yield document.get('id', number), document['text']
+
+
+# Function to group the documents in lists of batch_size documents
+def batches(documents, batch_size):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Function to load the tagger once in every process of the pool
+def init_worker():
+    global tagger
+    tagger = PerceptronTagger()
+
+
+# Function to process one document: sentences, tokens, POS tags (of the whole text, as textProcessor.py) and named entities
+def process_document(document, compact=False):
+    if tagger is None:
+        init_worker()
+    doc_id, text = document
+    sentences = nltk.sent_tokenize(text)
+    tokens = [token for sentence in sentences for token in nltk.word_tokenize(sentence)]
+    tagged = tagger.tag(tokens)
+    ne_chunked = nltk.ne_chunk(tagged, binary=True)
+    if compact:
+        record = compact_record(doc_id, text, tagged, ne_chunked, extractEntities(ne_chunked))
+        record['sentences'] = len(sentences)
+        return record
+    return {'id': doc_id, 'sentences': len(sentences), 'pos': tagged, 'entities': extractEntities(ne_chunked)}
+
+
+def process_batch(batch, compact=False):
+    return [process_document(document, compact) for document in batch]
+
+
+# Writer of the records of the full output, one json line per document
+class JsonLinesWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w')
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Function to process a collection of documents with a pool of processes, the records are written to output after every batch
+# returns the number of documents and the documents per second
+def run(source, output, processes=None, batch_size=32, compact=False):
+    start = time.perf_counter()
+    count = 0
+    writer = CompactWriter(output) if compact else JsonLinesWriter(output)
+    with writer as out, Pool(processes, initializer=init_worker) as pool:
+        # the batches are read while the pool works, and the results are written in the order of the documents
+        for records in pool.imap(partial(process_batch, compact=compact), batches(iter_documents(source), batch_size)):
+            for record in records:
+                out.write(record)
+            out.flush()
+            count += len(records)
+    seconds = time.perf_counter() - start
+    speed = count / seconds if seconds else 0.0
+    print("Documents: " + str(count) + ", " + str(round(speed, 1)) + " documents per second")
+    return count, speed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='NLP pipeline (sentences, tokens, POS, NER) over a collection of documents')
+    parser.add_argument('source', help='directory of .txt files or json lines file with "id" and "text"')
+    parser.add_argument('output', help='json lines file of the results')
+    parser.add_argument('--processes', type=int, default=None, help='number of processes (all the cores by default)')
+    parser.add_argument('--batch-size', type=int, default=32, help='documents per batch')
+    parser.add_argument('--compact', action='store_true', help='write the compact records (tag ids, token offsets, entity spans)')
+    args = parser.parse_args()
+    run(args.source, args.output, args.processes, args.batch_size, args.compact)
@@ -8,10 +8,11 @@ import nltk
 #nltk.download('punkt')
 from nltk.tokenize import sent_tokenize
 
-text = None
-with open('doc.txt', 'r') as f:
-    text = f.read()
+#Function to count the sentences of a file
+def count_sentences(file):
+    with open(file, 'r') as f:
+        text = f.read()
+    return len(sent_tokenize(text))
 
-sentences = sent_tokenize(text)
-
-print(len(sentences))
\ No newline at end of file
+if __name__ == '__main__':
+    print(count_sentences('doc.txt'))
@@ -0,0 +1,76 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Conversion funnel of the usage data, the clicks of any set of main and micro conversion pages are counted in one grouped pass.
+ConversionFunnel is a standalone API for live logs (main.py does not use it, the clicks.csv of the analysis has no time of the clicks): it is updated
+with every new batch of clicks and keeps the counts of every hourly or daily window of time, the window of a click is the one of its time column
+or, without it, the one of the timestamp of the batch. Only the windows of the horizon (the last horizon windows) are kept, the older ones are
+dropped, so the statistics of the last windows are available without reading the whole history again.
+Input of the function: clicks (PageName and optionally a time column) in pandas DataFrames and the timestamp of every batch
+Output of the function: number of clicks of every conversion page, in total and for every window
+"""
+
+#Imports
+import pandas as pd
+
+#Default conversion pages
+MAIN_CONVERSIONS = ('APPLICATION', 'CATALOG')
+MICRO_CONVERSIONS = ('DISCOUNT', 'HOWTOJOIN', 'INSURANCE', 'WHOWEARE')
+
+#Length of the windows of the funnel
+WINDOWS = {'hour': pd.Timedelta(hours=1), 'day': pd.Timedelta(days=1)}
+
+#Function to get the number of clicks of every conversion page from the number of clicks of every page, a page without clicks counts 0
+def conversion_counts(page_counts, main=MAIN_CONVERSIONS, micro=MICRO_CONVERSIONS):
+    pages = list(main) + list(micro)
+    counts = pd.Series(page_counts, dtype='int64').reindex(pages, fill_value=0)
+    return counts, int(counts[list(main)].sum()), int(counts[list(micro)].sum())
+
+#Class to keep the conversion counts of the last windows of time, updated with every new batch of clicks,
+#with time_column the window of every click is the one of its time, otherwise the one of the timestamp given to update()
+class ConversionFunnel:
+    def __init__(self, main=MAIN_CONVERSIONS, micro=MICRO_CONVERSIONS, window='hour', horizon=24, time_column=None):
+        if window not in WINDOWS:
+            raise ValueError("unknown window: " + str(window))
+        self.main = list(main)
+        self.micro = list(micro)
+        self.size = WINDOWS[window]
+        self.horizon = horizon
+        self.time_column = time_column
+        #one row for every window (start time of the window) and one column for every conversion page, plus the number of clicks of the window
+        self.counts = pd.DataFrame(columns=['Clicks'] + self.main + self.micro, dtype='int64')
+
+    #Function to get the first window of the last n windows, the last window is the latest one with clicks
+    def first_window(self, n):
+        return self.counts.index[-1] - (n - 1) * self.size
+
+    #Function to add a batch of clicks, the timestamp of the batch (now by default) is the time of the clicks without time column,
+    #the windows older than the horizon are dropped
+    def update(self, clicks, timestamp=None):
+        if self.time_column is None:
+            times = pd.Series(pd.Timestamp.now() if timestamp is None else pd.Timestamp(timestamp), index=clicks.index)
+        else:
+            times = pd.to_datetime(clicks[self.time_column])
+        table = pd.crosstab(times.dt.floor(self.size).rename('Window'), clicks['PageName'])
+        clicks_count = table.sum(axis=1)
+        table = table.reindex(columns=self.main + self.micro, fill_value=0)
+        table.insert(0, 'Clicks', clicks_count)
+        table.columns.name = None
+        if len(self.counts):
+            table = self.counts.add(table, fill_value=0)
+        self.counts = table.astype('int64').sort_index()
+        if self.horizon is not None and len(self.counts):
+            self.counts = self.counts[self.counts.index >= self.first_window(self.horizon)]
+        return self
+
+    #Function to get the counts of the windows of the last n windows of time (all the windows kept if n is None) with the totals of main and
+    #micro conversions, the windows without clicks have no row
+    def window(self, n=None):
+        counts = self.counts if n is None or not len(self.counts) else self.counts[self.counts.index >= self.first_window(n)]
+        counts = counts.copy()
+        counts['Main'] = counts[self.main].sum(axis=1)
+        counts['Micro'] = counts[self.micro].sum(axis=1)
+        return counts
+
+    #Function to get the total counts of the last n windows (all the windows kept if n is None)
+    def totals(self, n=None):
+        return self.window(n).sum()
@@ -0,0 +1,124 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Frequent itemset engines for the association rule mining of the usage data, they return the same itemsets and supports as apriori() in main.py.
+Eclat keeps a vertical bitset (one bit per transaction) of every item in NumPy arrays and gets the support of an itemset with the AND of the bitsets and a popcount.
+FP-growth compresses the transactions in a prefix tree ordered by item frequency and mines it recursively with conditional trees.
+The association rules are generated from the supports of the frequent itemsets only, without reading the transactions again.
+Input of the function: list of transactions (iterables of items) and the minimum support
+Output of the function: list of frequent itemsets (frozensets) and dictionary with the support of every frequent itemset, list of association rules
+"""
+
+#Imports
+import numpy as np
+from itertools import combinations
+
+#Number of bits set in every byte
+POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.int64)
+
+#Function to build the vertical representation: the items, a matrix with the packed bitset of the transactions of every item
+#and the number of occurrences of every item (an item repeated in a transaction counts every time, as in frequentItems() of main.py)
+def vertical_bitsets(transactions):
+    items = {}
+    rows, columns = [], []
+    for t, trans in enumerate(transactions):
+        for item in trans:
+            rows.append(items.setdefault(item, len(items)))
+            columns.append(t)
+    #the bits are set directly in the packed matrix, the first transaction is the highest bit of the first byte
+    rows = np.array(rows, dtype=np.int64)
+    columns = np.array(columns, dtype=np.int64)
+    bitsets = np.zeros((len(items), (len(transactions) + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bitsets, (rows, columns >> 3), (128 >> (columns & 7)).astype(np.uint8))
+    return list(items), bitsets, np.bincount(rows, minlength=len(items))
+
+#Function to mine the frequent itemsets with Eclat over the bitsets, depth first from the least frequent items
+def eclat(transactions, support):
+    n = len(transactions)
+    items, bitsets, counts = vertical_bitsets(transactions)
+    frequent = [i for i in np.argsort(counts, kind='stable') if counts[i] / n >= support]
+
+    result = []
+    supports = {}
+    #every entry of the stack is a prefix and its extensions: items, bitsets and counts of prefix + item
+    frequent = np.array(frequent, dtype=np.int64)
+    stack = [(frozenset(), [items[i] for i in frequent], bitsets[frequent], counts[frequent])]
+    while stack:
+        prefix, extensions, extension_bits, extension_counts = stack.pop()
+        for e, item in enumerate(extensions):
+            itemset = prefix | {item}
+            result.append(itemset)
+            supports[itemset] = int(extension_counts[e]) / n
+            #the next extensions are the following items that are still frequent together with this one
+            bits = extension_bits[e] & extension_bits[e + 1:]
+            bit_counts = POPCOUNT[bits].sum(axis=1)
+            keep = np.flatnonzero(bit_counts / n >= support)
+            if len(keep):
+                stack.append((itemset, [extensions[e + 1 + k] for k in keep], bits[keep], bit_counts[keep]))
+    return result, supports
+
+#Function to build the FP-tree of weighted transactions, a node is [item, count, parent, children], returns the nodes of every item
+def build_tree(patterns, rank):
+    root = [None, 0, None, {}]
+    header = {}
+    for items, count in patterns:
+        node = root
+        for item in sorted({item for item in items if item in rank}, key=rank.__getitem__):
+            child = node[3].get(item)
+            if child is None:
+                child = [item, 0, node, {}]
+                node[3][item] = child
+                header.setdefault(item, []).append(child)
+            child[1] += count
+            node = child
+    return header
+
+#Function to mine the frequent itemsets with FP-growth
+def fpgrowth(transactions, support):
+    n = len(transactions)
+    result = []
+    supports = {}
+    #every entry of the stack is a suffix and its conditional pattern base (list of items and count),
+    #the first one is the transactions themselves so the repeated items count every time for the single items
+    stack = [(frozenset(), [(trans, 1) for trans in transactions])]
+    while stack:
+        suffix, patterns = stack.pop()
+        counts = {}
+        for items, count in patterns:
+            for item in items:
+                counts[item] = counts.get(item, 0) + count
+        frequent = [item for item in counts if counts[item] / n >= support]
+        #the tree goes from the most frequent item to the least frequent one
+        rank = {item: r for r, item in enumerate(sorted(frequent, key=lambda item: -counts[item]))}
+        header = build_tree(patterns, rank)
+        for item in frequent:
+            itemset = suffix | {item}
+            result.append(itemset)
+            supports[itemset] = counts[item] / n
+            #conditional pattern base: the path from the root to every node of the item
+            conditional = []
+            for node in header[item]:
+                path = []
+                parent = node[2]
+                while parent[0] is not None:
+                    path.append(parent[0])
+                    parent = parent[2]
+                if path:
+                    conditional.append((path, node[1]))
+            if conditional:
+                stack.append((itemset, conditional))
+    return result, supports
+
+#Function to generate the association rules antecedent -> consequent of the frequent itemsets with a confidence and a lift of at least the ones given,
+#every subset of a frequent itemset is frequent too, so its support is already in the dictionary and the time is linear in the number of itemsets
+def association_rules(supports, min_confidence=0.5, min_lift=1.0):
+    rules = []
+    for itemset, support in supports.items():
+        for size in range(1, len(itemset)):
+            for antecedent in combinations(itemset, size):
+                antecedent = frozenset(antecedent)
+                consequent = itemset - antecedent
+                confidence = support / supports[antecedent]
+                lift = confidence / supports[consequent]
+                if confidence >= min_confidence and lift >= min_lift:
+                    rules.append((antecedent, consequent, support, confidence, lift))
+    return rules
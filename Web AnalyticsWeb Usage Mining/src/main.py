@@ -2,60 +2,80 @@
 Author: Francisco Medel Molinero
 Description of the script: Design a suitable data representation for the analysis - association rule mining, removing short and long visits, identifying main and micro conversions and extracting the principal statistics
 Input of the function: data in csv format
-Output of the function: processed_data.csv, statistics.csv, results.csv
+Output of the function: processed_data.csv, statistics.csv, results.csv, rules.csv
+(with streaming=True the transactions are the pages and topics of every visit instead of the cleaned click rows, so the itemsets and the rules
+are not comparable with the default ones and are written in processed_visits.csv, results_visits.csv and rules_visits.csv)
 """
 
 #Imports
 import numpy as np
 import pandas as pd
 from collections import Counter
+from frequentItemsets import eclat, fpgrowth, association_rules
+from conversionFunnel import MAIN_CONVERSIONS, MICRO_CONVERSIONS, conversion_counts
+
+#Columns of the clicks and the visitors that the analysis needs, with compact types for the streaming mode
+CLICK_COLUMNS = {'VisitID': 'int32', 'PageName': 'category', 'TopicName': 'category'}
+VISITOR_COLUMNS = {'VisitID': 'int32', 'Length_seconds': 'float32'}
+
+#Output files of the transactions, the frequent itemsets and the rules, the streaming mode mines other transactions (the items of every visit)
+#so it writes other files
+OUTPUTS = {False: ("processed_data.csv", "results.csv", "rules.csv"), True: ("processed_visits.csv", "results_visits.csv", "rules_visits.csv")}
+
+#Names of the conversion pages in the statistics
+PAGE_LABELS = {'APPLICATION': 'application', 'CATALOG': 'catalog', 'DISCOUNT': 'discount', 'HOWTOJOIN': 'how to join',
+               'INSURANCE': 'insurance', 'WHOWEARE': 'who we are'}
 
 #Function to read the data
 def read_data(file):
     df = pd.read_csv(file)
     return df
 
-#this function debugs the "clicks.csv" file based on the time in seconds of the visit, if the time of the visit is too short (less than 300 seconds) or the time of the visit is too long (more than 600 seconds), then the visit is deleted
-def file_cleaner(clicks, visitors):
-    blackList = []
-    for index, row in visitors.iterrows():
-        if row['Length_seconds'] < 300 or row['Length_seconds'] > 600:
-            blackList.append(row['VisitID'])
-    for index, row in clicks.iterrows():
-        if row['VisitID'] in blackList:
-            clicks.drop(index, inplace=True)
-    return clicks
+#Function to read a csv file in chunks of rows, only with the columns and types given
+def read_chunks(file, columns, chunksize):
+    return pd.read_csv(file, usecols=list(columns), dtype=columns, chunksize=chunksize)
+
+#Function to get the VisitID of the visits that are too short (less than min_length seconds) or too long (more than max_length seconds)
+def black_list(visitors, min_length=300, max_length=600):
+    length = visitors['Length_seconds']
+    return visitors.loc[(length < min_length) | (length > max_length), 'VisitID']
+
+#this function debugs the "clicks.csv" file based on the time in seconds of the visit, if the time of the visit is too short or too long, then the visit is deleted
+#the clicks of the black list are removed with a hash join (isin) on VisitID, so the time is linear in the number of clicks
+def file_cleaner(clicks, visitors, min_length=300, max_length=600):
+    return clicks[~clicks['VisitID'].isin(black_list(visitors, min_length, max_length))]
+
+#Function to stream the clicks file: every chunk is cleaned and added to the transactions of its visits (set of items of the columns given) and to the page counts,
+#so the memory used is one chunk plus the transactions, not the whole file
+def stream_transactions(file, blackList, chunksize=100000, items=('PageName', 'TopicName')):
+    transactions = {}
+    page_counts = pd.Series(dtype='int64')
+    for chunk in read_chunks(file, CLICK_COLUMNS, chunksize):
+        chunk = chunk[~chunk['VisitID'].isin(blackList)]
+        page_counts = page_counts.add(chunk['PageName'].value_counts(), fill_value=0).astype('int64')
+        for column in items:
+            pairs = chunk[['VisitID', column]].dropna().drop_duplicates()
+            for visit, item in zip(pairs['VisitID'].tolist(), pairs[column].tolist()):
+                transactions.setdefault(visit, set()).add(item)
+    return transactions, page_counts
 
 #Function to extract the main statistics of the file
 def GeneralStatistics(processed_data):
-    #Num of visits
-    num_visits=processed_data['PageName'].value_counts().sum()
-
-    #Main conversions
-    Application_conv=processed_data.PageName.value_counts().APPLICATION
-    Catalog_conv = processed_data.PageName.value_counts().CATALOG
+    ConversionStatistics(processed_data['PageName'].value_counts())
 
-    #Micro conversions
-    Discount_conv=processed_data.PageName.value_counts().DISCOUNT
-    Howtojoin=processed_data.PageName.value_counts().HOWTOJOIN
-    Insurance=processed_data.PageName.value_counts().INSURANCE
-    Whoweare=processed_data.PageName.value_counts().WHOWEARE
-
-    #Number of main conversions
-    Num_main=Application_conv+Catalog_conv
+#Function to extract the main statistics from the number of clicks of every page, for any set of main and micro conversion pages
+def ConversionStatistics(page_counts, main=MAIN_CONVERSIONS, micro=MICRO_CONVERSIONS):
+    #Num of visits
+    num_visits=page_counts.sum()
 
-    #Number of micro conversions
-    Num_micro=Discount_conv+Howtojoin+Insurance+Whoweare
+    #Clicks of every conversion page and number of main and micro conversions
+    counts, Num_main, Num_micro = conversion_counts(page_counts, main, micro)
 
     #We save the data into a file
     with open("statistics.csv", "a") as o:
         o.write("Number of visits: "+str(num_visits)+'\n')
-        o.write("Number of application: "+str(Application_conv)+'\n')
-        o.write("Number of catalog: " + str(Catalog_conv) + '\n')
-        o.write("Number of discount: " + str(Discount_conv) + '\n')
-        o.write("Number of how to join: " + str(Howtojoin) + '\n')
-        o.write("Number of insurance: " + str(Insurance) + '\n')
-        o.write("Number of who we are: " + str(Whoweare) + '\n')
+        for page in counts.index:
+            o.write("Number of " + PAGE_LABELS.get(page, page.lower()) + ": " + str(counts[page]) + '\n')
         o.write("Total number of main conversions: " + str(Num_main) + '\n')
         o.write("Total number of micro conversions: " + str(Num_micro) + '\n')
 
@@ -97,7 +117,49 @@ def apriori(transactions, support):
     resultc = {item:(resultc[item]/len(transactions)) for item in resultc}
     return result, resultc
 
-def main():
+#Function to mine the frequent itemsets and their supports with the algorithm given: "apriori", "eclat" (vertical bitsets) or "fpgrowth"
+def frequent_itemsets(transactions, support, algorithm="eclat"):
+    if algorithm == "apriori":
+        result, supports = apriori(transactions, support)
+        return result, {itemset: supports[itemset] for itemset in result}
+    if algorithm == "eclat":
+        return eclat(transactions, support)
+    if algorithm == "fpgrowth":
+        return fpgrowth(transactions, support)
+    raise ValueError("unknown algorithm: " + str(algorithm))
+
+#Function to write the association rules in a csv file, the items of the antecedent and the consequent are separated by " | "
+def save_rules(rules, file):
+    def items(itemset):
+        return " | ".join(sorted(str(item) for item in itemset))
+    pd.DataFrame([(items(a), items(c), s, conf, lift) for a, c, s, conf, lift in rules],
+                 columns=['Antecedent', 'Consequent', 'Support', 'Confidence', 'Lift']).to_csv(file, index=False)
+
+#Main function, with streaming=True the clicks are read in chunks of chunksize rows and the transactions are the items of every visit
+#(the default transactions are the cleaned click rows: VisitID, PageName and TopicName), the results are written in the files of OUTPUTS
+def main(streaming=False, chunksize=100000, algorithm="eclat", min_confidence=0.5, min_lift=1.0):
+    processed_file, results_file, rules_file = OUTPUTS[streaming]
+    if streaming:
+        visitors = pd.read_csv('visitors.csv', usecols=list(VISITOR_COLUMNS), dtype=VISITOR_COLUMNS)
+        transactions, page_counts = stream_transactions('clicks.csv', black_list(visitors), chunksize)
+
+        #Report of the statistics
+        ConversionStatistics(page_counts)
+
+        #execution of the frequent itemset algorithm
+        frequentItemsets, supports = frequent_itemsets(list(transactions.values()), 0.01, algorithm)
+
+        #Saving the results, the processed transactions are written as one row for every item of every visit
+        pd.DataFrame([(visit, item) for visit in transactions for item in transactions[visit]],
+                     columns=['VisitID', 'Item']).to_csv(processed_file, index=False)
+
+        with open(results_file, "a") as o:
+            for f in frequentItemsets:
+                o.write("{} - {}".format(f, supports[f]) + '\n')
+
+        save_rules(association_rules(supports, min_confidence, min_lift), rules_file)
+        return
+
     #Load the data
     clicks = read_data('clicks.csv')
     visitors = read_data('visitors.csv')
@@ -114,16 +176,17 @@ def main():
     #Report of the statistics
     GeneralStatistics(processed_data)
 
-    #execution of the a priori algorithm
-    frequentItemsets, supports = apriori(processed_data.values, 0.01)
+    #execution of the frequent itemset algorithm
+    frequentItemsets, supports = frequent_itemsets(processed_data.values, 0.01, algorithm)
 
     #Saving the results
-    with open("processed_data.csv","a") as p:
-        p.write(str(processed_data))
+    processed_data.to_csv(processed_file, index=False)
 
-    with open("results.csv", "a") as o:
+    with open(results_file, "a") as o:
         for f in frequentItemsets:
             o.write("{} - {}".format(f, supports[f]) + '\n')
 
+    save_rules(association_rules(supports, min_confidence, min_lift), rules_file)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
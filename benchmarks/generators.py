@@ -0,0 +1,167 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Deterministic synthetic data for the benchmarks of the five modules, the same seed and scale always give the same data:
+Cranfield-shaped corpora (documents, queries and relevance judgements), click and visitor logs, cast csv rows, html product and listing pages
+and text documents. The size of every data set grows linearly with the scale, also the number of documents and the vocabulary of the Cranfield corpora.
+Input of the function: scale and seed
+Output of the function: python data (lists, pandas DataFrames) or files in the folder given
+"""
+
+import os
+import random
+from functools import lru_cache
+from itertools import accumulate
+
+#Most frequent words of the vocabulary of the synthetic texts, the rest of the words are generated from syllables
+WORDS = ["flow", "boundary", "layer", "pressure", "wing", "shock", "heat", "transfer", "mach", "number", "velocity", "surface",
+         "theory", "experimental", "results", "body", "supersonic", "plate", "solution", "method", "effects", "distribution",
+         "temperature", "reynolds", "laminar", "turbulent", "cylinder", "cone", "stream", "jet", "nozzle", "buckling", "shell",
+         "panel", "load", "stress", "vibration", "frequency", "aircraft", "airfoil", "drag", "lift", "wake", "vortex", "blunt"]
+NAMES = ["Prague", "Vltava", "Europe", "Charles", "Bohemia", "Madrid", "Spain", "Francisco", "Casika", "Obama", "London", "Paris"]
+PAGES = ["HOME", "APPLICATION", "CATALOG", "DISCOUNT", "HOWTOJOIN", "INSURANCE", "WHOWEARE", "CONTACT", "NEWS", "SEARCH", "OFFER"]
+TOPICS = ["Tourism", "Bulgaria", "Tourist", "challenging expedition", "Sport", "Culture", "Nature", "Food", "History", "Beach"]
+SYLLABLES = [consonant + vowel for consonant in "bcdfghklmnprstvz" for vowel in "aeiou"]
+
+
+#Function to get the vocabulary of size words and the cumulative Zipf weights of them (the word of rank r has weight 1 / r),
+#the words of WORDS come first and the rest are made of two or more syllables
+@lru_cache(maxsize=None)
+def vocabulary(size):
+    vocabulary_words = WORDS[:size]
+    known = set(WORDS)
+    rank = len(SYLLABLES)
+    while len(vocabulary_words) < size:
+        word, number = "", rank
+        while number:
+            number, syllable = divmod(number, len(SYLLABLES))
+            word = SYLLABLES[syllable] + word
+        if word not in known:
+            vocabulary_words.append(word)
+        rank += 1
+    return vocabulary_words, list(accumulate(1.0 / (r + 1) for r in range(size)))
+
+
+#Function to get n words of a vocabulary of size words (by default only the words of WORDS)
+def words(rng, n, size=len(WORDS)):
+    vocabulary_words, cum_weights = vocabulary(size)
+    return rng.choices(vocabulary_words, cum_weights=cum_weights, k=n)
+
+
+#Function to get the number of documents, the number of queries and the size of the vocabulary of a Cranfield-shaped collection,
+#1400 documents, 225 queries and 8000 words (like the real one) with scale 1.0
+def cranfield_size(scale=1.0):
+    return max(1, int(1400 * scale)), max(1, int(225 * scale)), max(len(WORDS), int(8000 * scale))
+
+
+#Function to write a Cranfield-shaped collection in folder/cranfield: d/<n>.txt documents, q/<n>.txt queries and r/<n>.txt relevant documents,
+#the documents have 60 to 240 words and the scale changes the number of documents and queries and the size of the vocabulary
+#returns the folder, the number of documents and the number of queries
+def cranfield(folder, scale=1.0, seed=0):
+    rng = random.Random(seed)
+    documents, queries, size = cranfield_size(scale)
+    for sub in ("d", "q", "r"):
+        os.makedirs(os.path.join(folder, "cranfield", sub), exist_ok=True)
+    for d in range(documents):
+        with open(os.path.join(folder, "cranfield", "d", str(d + 1) + ".txt"), "w") as f:
+            f.write(" ".join(words(rng, rng.randint(60, 240), size)))
+    for q in range(queries):
+        with open(os.path.join(folder, "cranfield", "q", str(q + 1) + ".txt"), "w") as f:
+            f.write(" ".join(words(rng, rng.randint(5, 20), size)))
+        with open(os.path.join(folder, "cranfield", "r", str(q + 1) + ".txt"), "w") as f:
+            f.write("\n".join(str(d) for d in sorted(rng.sample(range(1, documents + 1), rng.randint(1, min(30, documents))))))
+    return os.path.join(folder, "cranfield"), documents, queries
+
+
+#Function to get the documents and the queries of a Cranfield-shaped collection without writing files
+def cranfield_corpus(scale=1.0, seed=0):
+    rng = random.Random(seed)
+    documents, queries, size = cranfield_size(scale)
+    corpus = [" ".join(words(rng, rng.randint(60, 240), size)) for _ in range(documents)]
+    return corpus, [" ".join(words(rng, rng.randint(5, 20), size)) for _ in range(queries)]
+
+
+#Function to get the clicks and the visitors of the usage mining module, with the columns of clicks.csv and visitors.csv
+def usage_logs(scale=1.0, seed=0):
+    import pandas as pd
+    rng = random.Random(seed)
+    visits = max(10, int(5000 * scale))
+    visitors = pd.DataFrame({"VisitID": range(1, visits + 1),
+                             "Length_seconds": [rng.randint(10, 1200) for _ in range(visits)],
+                             "Referrer": [rng.choice(["google", "bing", "direct"]) for _ in range(visits)],
+                             "Day": [rng.randint(1, 7) for _ in range(visits)],
+                             "Hour": [rng.randint(0, 23) for _ in range(visits)],
+                             "Length_pagecount": [rng.randint(1, 20) for _ in range(visits)]})
+    rows = []
+    for visit in range(1, visits + 1):
+        for sequence in range(rng.randint(1, 12)):
+            rows.append((rng.randint(1, 10 ** 6), visit, rng.choice(PAGES), rng.choice(TOPICS), sequence))
+    clicks = pd.DataFrame(rows, columns=["LocalID", "VisitID", "PageName", "TopicName", "SequenceNumber"])
+    return clicks, visitors
+
+
+#Function to get the transactions (items of every visit) of the usage mining module
+def transactions(scale=1.0, seed=0):
+    clicks, visitors = usage_logs(scale, seed)
+    grouped = {}
+    for visit, page, topic in zip(clicks["VisitID"], clicks["PageName"], clicks["TopicName"]):
+        grouped.setdefault(visit, set()).update((page, topic))
+    return list(grouped.values())
+
+
+#Function to get the rows of casts.csv (id;film;actor) of the social network module, every film has a cast of a few actors
+def casts(scale=1.0, seed=0):
+    rng = random.Random(seed)
+    films = max(10, int(2000 * scale))
+    actors = ["actor%06d" % a for a in range(max(20, int(3000 * scale)))]
+    weights = [1.0 / (rank + 1) ** 0.5 for rank in range(len(actors))]
+    rows = []
+    for film in range(films):
+        for actor in dict.fromkeys(rng.choices(actors, weights=weights, k=rng.randint(2, 10))):
+            rows.append([str(len(rows)), "film%06d" % film, actor])
+    return rows
+
+
+#Function to write casts.csv in the folder given
+def casts_file(folder, scale=1.0, seed=0):
+    path = os.path.join(folder, "casts.csv")
+    with open(path, "w") as f:
+        for row in casts(scale, seed):
+            f.write(";".join(row) + "\n")
+    return path
+
+
+#Function to get html product pages like the ones of the crawler, with a menu and a footer around the product
+def product_pages(scale=1.0, seed=0):
+    rng = random.Random(seed)
+    menu = "".join('<li><a href="/c/%d">%s</a></li>' % (i, word) for i, word in enumerate(WORDS))
+    pages = []
+    for p in range(max(1, int(200 * scale))):
+        pages.append('<html><head><meta charset="utf-8"><title>Product %d</title></head><body>'
+                     '<nav><ul>%s</ul></nav><div class="product">'
+                     '<div class="product-description-short"><p>%s</p></div>'
+                     '<div class="product-prices"><div class="current-price"><span>%d,99 €</span> <span>-%d%%</span></div></div>'
+                     '</div><footer>%s</footer></body></html>'
+                     % (p, menu * 5, " ".join(words(rng, 30)), rng.randint(10, 999), rng.randint(5, 50), menu * 5))
+    return pages
+
+
+#Function to get html listing pages with the product links of the crawler
+def listing_pages(scale=1.0, seed=0):
+    rng = random.Random(seed)
+    return ['<html><body>%s</body></html>' % "".join('<a class="product_name" href="https://casika.es/p/%d-%d">%s</a>'
+                                                     % (page, i, " ".join(words(rng, 3))) for i in range(24))
+            for page in range(max(1, int(20 * scale)))]
+
+
+#Function to get text documents with sentences and named entities for the text mining module
+def text_documents(scale=1.0, seed=0):
+    rng = random.Random(seed)
+    documents = []
+    for d in range(max(1, int(100 * scale))):
+        sentences = []
+        for _ in range(rng.randint(5, 20)):
+            sentence = words(rng, rng.randint(6, 18))
+            sentence.insert(rng.randint(0, len(sentence)), rng.choice(NAMES))
+            sentences.append(" ".join(sentence).capitalize() + ".")
+        documents.append(("doc%05d" % d, " ".join(sentences)))
+    return documents
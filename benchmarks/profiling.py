@@ -0,0 +1,97 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Timing and profiling hook of the benchmarks, every stage (a block of code with a name) records its wall time, its CPU time
+and its peak of memory (tracemalloc, only the memory allocated by python in the stage; with memory=False it is not traced, tracemalloc slows the code).
+With profile=True (or the environment variable WDM_PROFILE=1) the functions that take more time in every stage are recorded too (cProfile),
+and with trace=True every stage is written as one json line when it ends, so a long run can be followed with tail -f.
+Input of the function: names of the stages and the code of every stage
+Output of the function: list of the records of the stages and json file with them
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+#Function to know if the profiling is enabled by the environment
+def profiling_enabled():
+    return os.environ.get("WDM_PROFILE", "") not in ("", "0")
+
+
+#Function to get the functions with more cumulative time of a profile, as (function, calls, seconds)
+def top_functions(profile, n=15):
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = []
+    for (file, line, name), (calls, primitive, total, cumulative, callers) in stats.stats.items():
+        rows.append(("%s:%d(%s)" % (os.path.basename(file), line, name), calls, cumulative))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return [{"function": function, "calls": calls, "seconds": round(seconds, 6)} for function, calls, seconds in rows[:n]]
+
+
+#Function to get the reason of an exception in one line (the LookupError of nltk is a whole box of text)
+def reason(e):
+    lines = [line.strip() for line in str(e).splitlines() if line.strip(" *")]
+    return type(e).__name__ + (": " + lines[0] if lines else "")
+
+
+#Class to measure the stages of a benchmark, every record has the name, the seconds, the cpu seconds, the peak of memory in bytes,
+#the status ("ok", "skipped" or "error") and the extra values given to the stage
+class Profiler:
+    def __init__(self, profile=None, trace=None, memory=True, stream=None):
+        self.memory = memory
+        self.profile = profiling_enabled() if profile is None else profile
+        self.trace = self.profile if trace is None else trace
+        self.stream = stream or sys.stderr
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, **extra):
+        record = {"stage": name, "status": "ok"}
+        record.update(extra)
+        profile = cProfile.Profile() if self.profile else None
+        started = self.memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        if self.memory:
+            tracemalloc.reset_peak()
+        start, cpu = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield record
+        except SkipStage as e:
+            record["status"] = "skipped"
+            record["reason"] = str(e)
+        except Exception as e:
+            record["status"] = "error"
+            record["reason"] = reason(e)
+        finally:
+            if profile:
+                profile.disable()
+            record["seconds"] = round(time.perf_counter() - start, 6)
+            record["cpu_seconds"] = round(time.process_time() - cpu, 6)
+            if self.memory:
+                record["peak_memory"] = tracemalloc.get_traced_memory()[1]
+            if started:
+                tracemalloc.stop()
+            if profile:
+                record["top_functions"] = top_functions(profile)
+            self.records.append(record)
+            if self.trace:
+                self.stream.write(json.dumps(record) + "\n")
+                self.stream.flush()
+
+    def save(self, path, **metadata):
+        with open(path, "w") as f:
+            json.dump(dict(metadata, stages=self.records), f, indent=2)
+
+
+#Exception to skip a stage, for example when a dependency or a model of nltk is not installed
+class SkipStage(Exception):
+    pass
@@ -0,0 +1,202 @@
+"""
+Author: Francisco Medel Molinero
+Description of the script: Benchmark suite of the five modules with the synthetic data of generators.py: the vector space matrices and the cosine and
+euclidean ranking of the retrieval, the cleaning of the clicks and the frequent itemsets of the usage mining, the graph and the centralities of the
+social network, the parse step of the crawler with every parser backend and the tagging of the text mining pipeline.
+Every stage is measured with the Profiler of profiling.py (seconds, cpu seconds and peak of memory), a stage whose dependency (or nltk model)
+is not installed is recorded as skipped, so the same command works in every environment.
+Input of the function: scale of the data, seed, modules to run, --profile for the cProfile functions and the json lines trace of every stage
+Output of the function: json file with the records of the stages (benchmarks.json by default)
+"""
+
+import argparse
+import importlib.util
+import os
+import platform
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import generators
+from profiling import Profiler, SkipStage, reason
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = {
+    "retrieval": os.path.join(ROOT, "Indexing & Document Retrieval", "src"),
+    "usage": os.path.join(ROOT, "Web AnalyticsWeb Usage Mining", "src"),
+    "social": os.path.join(ROOT, "Social Network Analysis", "src"),
+    "crawler": os.path.join(ROOT, "Data Acquisition - Web CrawlerScraper", "src"),
+    "text": os.path.join(ROOT, "Text Mining", "src"),
+}
+
+
+#Function to load a file of the src folder of a module, with a name of its own (three modules have a main.py)
+#the folder is added to sys.path so the file can import the other files of its module; a missing dependency skips the stage
+def load(module, file):
+    name = module + "_" + file
+    if name in sys.modules:
+        return sys.modules[name]
+    if SOURCES[module] not in sys.path:
+        sys.path.insert(0, SOURCES[module])
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SOURCES[module], file + ".py"))
+    loaded = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(loaded)
+    except (ImportError, LookupError) as e:
+        raise SkipStage(reason(e))
+    sys.modules[name] = loaded
+    return loaded
+
+
+#Function to run a block of code in another working directory (the retrieval module reads ./cranfield)
+@contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+#Benchmark of the retrieval: reading of the cranfield folder, the three matrices of the documents and one query, and the ranking of every matrix,
+#the number of documents and queries is the one of the generated collection
+def bench_retrieval(profiler, scale, seed, folder):
+    with profiler.stage("retrieval.generate", scale=scale) as record:
+        path, documents, queries = generators.cranfield(folder, scale, seed)
+        record["documents"], record["queries"] = documents, queries
+    with profiler.stage("retrieval.import") as record:
+        main = load("retrieval", "main")
+    if record["status"] != "ok":
+        return
+    with profiler.stage("retrieval.read_corpus") as record:
+        with working_directory(folder):
+            corpus = main.read_corpus("d", documents)
+            questions = main.read_corpus("q", queries)
+        record["documents"] = len(corpus)
+    with profiler.stage("retrieval.get_matrices") as record:
+        matrices = main.get_matrices(corpus + [questions[0]])
+        record["terms"] = matrices[0].shape[1]
+    for matrix_name, matrix in zip(("binary", "tf", "tf_idf"), matrices):
+        with profiler.stage("retrieval.cos_and_euclidean", matrix=matrix_name):
+            main.cos_and_euclidean(matrix, documents)
+
+
+#Benchmark of the usage mining: cleaning of the clicks and the frequent itemsets with every algorithm
+def bench_usage(profiler, scale, seed, support=0.2):
+    with profiler.stage("usage.generate", scale=scale) as record:
+        clicks, visitors = generators.usage_logs(scale, seed)
+        record["clicks"] = len(clicks)
+    with profiler.stage("usage.import") as record:
+        main = load("usage", "main")
+    if record["status"] != "ok":
+        return
+    with profiler.stage("usage.file_cleaner") as record:
+        record["clicks"] = len(main.file_cleaner(clicks, visitors))
+    transactions = generators.transactions(scale, seed)
+    with profiler.stage("usage.apriori", transactions=len(transactions), support=support) as record:
+        record["itemsets"] = len(main.apriori(transactions, support)[0])
+    for algorithm in ("eclat", "fpgrowth"):
+        with profiler.stage("usage.frequent_itemsets", algorithm=algorithm, transactions=len(transactions), support=support) as record:
+            record["itemsets"] = len(main.frequent_itemsets(transactions, support, algorithm)[0])
+
+
+#Benchmark of the social network: reading of casts.csv, the graph, the sparse adjacency matrix and the centralities
+def bench_social(profiler, scale, seed, folder):
+    with profiler.stage("social.generate", scale=scale):
+        path = generators.casts_file(folder, scale, seed)
+    with profiler.stage("social.import") as record:
+        main = load("social", "main")
+    if record["status"] != "ok":
+        return
+    with profiler.stage("social.read_file") as record:
+        data = main.read_file(path)
+        record["rows"] = len(data)
+    with profiler.stage("social.CreateGraph") as record:
+        G = main.CreateGraph(data)
+        record["nodes"], record["edges"] = G.number_of_nodes(), G.number_of_edges()
+    with profiler.stage("social.CreateAdjacency"):
+        adjacency = main.CreateAdjacency(data, weighted=False)
+    # the betweenness is approximated with k pivots, the exact one is too slow for the larger scales
+    centralities = main.Centralities(G, k=min(100, G.number_of_nodes()), seed=seed, adjacency=adjacency)
+    for name in ("degree", "eigenvector", "betweenness", "closeness"):
+        with profiler.stage("social.centralities", centrality=name):
+            centralities.get(name)
+
+
+#Benchmark of the parse step of the crawler with every backend, over the same listing and product pages
+def bench_crawler(profiler, scale, seed):
+    listings = generators.listing_pages(scale, seed)
+    products = generators.product_pages(scale, seed)
+    with profiler.stage("crawler.import") as record:
+        extractors = load("crawler", "extractors")
+    if record["status"] != "ok":
+        return
+    for backend in ("html.parser-full", "html.parser", "lxml", "lxml-xpath"):
+        with profiler.stage("crawler.parse", backend=backend, pages=len(listings) + len(products)) as record:
+            if backend.startswith("lxml") and extractors.lxml is None:
+                raise SkipStage("lxml is not installed")
+            extractor = extractors.get_extractor("casika.es", backend)
+            for page in listings:
+                extractor.parse_listing(page)
+            for page in products:
+                extractor.parse_product(page)
+
+
+#Benchmark of the text mining: sentences, tokens, POS tagging and NER of the documents, in one process
+def bench_text(profiler, scale, seed):
+    documents = generators.text_documents(scale, seed)
+    with profiler.stage("text.import") as record:
+        pipeline = load("text", "pipeline")
+    if record["status"] != "ok":
+        return
+    with profiler.stage("text.process_document", documents=len(documents)) as record:
+        try:
+            pipeline.init_worker()
+            records = [pipeline.process_document(document) for document in documents]
+        except LookupError as e:
+            raise SkipStage("nltk data is not installed, " + reason(e))
+        record["tokens"] = sum(len(r["pos"]) for r in records)
+
+
+#Function to run the benchmarks of the modules given and save the records of the stages in output
+def run(modules, scale=1.0, seed=0, output="benchmarks.json", profile=None, memory=True):
+    profiler = Profiler(profile=profile, memory=memory)
+    with tempfile.TemporaryDirectory() as folder:
+        for module in modules:
+            if module == "retrieval":
+                bench_retrieval(profiler, scale, seed, folder)
+            elif module == "usage":
+                bench_usage(profiler, scale, seed)
+            elif module == "social":
+                bench_social(profiler, scale, seed, folder)
+            elif module == "crawler":
+                bench_crawler(profiler, scale, seed)
+            elif module == "text":
+                bench_text(profiler, scale, seed)
+    profiler.save(output, scale=scale, seed=seed, python=platform.python_version(), machine=platform.machine())
+    for record in profiler.records:
+        extra = ", ".join(str(key) + "=" + str(value) for key, value in record.items()
+                          if key not in ("stage", "status", "seconds", "cpu_seconds", "peak_memory", "top_functions", "reason"))
+        line = record["stage"] + (" (" + extra + ")" if extra else "") + ": "
+        if record["status"] == "ok":
+            line += str(round(record["seconds"], 3)) + " s"
+            if "peak_memory" in record:
+                line += ", " + str(round(record["peak_memory"] / 2 ** 20, 1)) + " MB"
+        else:
+            line += record["status"] + " (" + record["reason"] + ")"
+        print(line)
+    return profiler.records
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of the modules with deterministic synthetic data')
+    parser.add_argument('--scale', type=float, default=1.0, help='size of the data (1.0: 1400 Cranfield documents, 5000 visits, 2000 films, 200 product pages, 100 documents)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generators')
+    parser.add_argument('--modules', nargs='+', choices=list(SOURCES), default=list(SOURCES), help='modules to run (all by default)')
+    parser.add_argument('--output', default='benchmarks.json', help='json file of the results')
+    parser.add_argument('--profile', action='store_true', default=None,
+                        help='record the cProfile functions of every stage and trace the stages as json lines in stderr (or WDM_PROFILE=1)')
+    parser.add_argument('--no-memory', action='store_true', help='do not trace the memory (faster timings, no peak memory)')
+    args = parser.parse_args()
+    run(args.modules, args.scale, args.seed, args.output, args.profile, not args.no_memory)